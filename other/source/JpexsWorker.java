@@ -0,0 +1,54 @@
+import java.io.BufferedReader;
+import java.io.FileDescriptor;
+import java.io.FileOutputStream;
+import java.io.InputStreamReader;
+import java.io.PrintStream;
+import java.lang.reflect.InvocationTargetException;
+import java.lang.reflect.Method;
+import java.nio.charset.StandardCharsets;
+
+/**
+ * Runs FFDec command lines inside a single JVM so the injector only pays the
+ * JVM and FFDec startup cost once per session.
+ *
+ * Launched by jpexs.py as "java -cp ffdec.jar JpexsWorker.java". Each stdin
+ * line is one FFDec command line with the arguments separated by tabs. After
+ * each command a status line "<marker> <code> [message]" is written to stdout;
+ * everything FFDec prints goes to stderr, followed by a "<marker>" line so the
+ * reader knows the command's stderr output is complete.
+ */
+public class JpexsWorker {
+    private static final String MARKER = "@@JPEXS-WORKER@@";
+
+    public static void main(String[] args) throws Exception {
+        Method parseArguments = Class.forName("com.jpexs.decompiler.flash.console.CommandLineArgumentParser")
+                .getMethod("parseArguments", String[].class);
+        PrintStream protocol = new PrintStream(new FileOutputStream(FileDescriptor.out), true, "UTF-8");
+        System.setOut(System.err);
+
+        BufferedReader in = new BufferedReader(new InputStreamReader(System.in, StandardCharsets.UTF_8));
+        endStderr();
+        protocol.println(MARKER + " 0 ready");
+        String line;
+        while ((line = in.readLine()) != null) {
+            if (line.isEmpty()) {
+                continue;
+            }
+            try {
+                parseArguments.invoke(null, (Object) line.split("\t", -1));
+                endStderr();
+                protocol.println(MARKER + " 0");
+            } catch (Throwable e) {
+                Throwable cause = e instanceof InvocationTargetException ? e.getCause() : e;
+                cause.printStackTrace();
+                endStderr();
+                protocol.println(MARKER + " 1 " + String.valueOf(cause).replace('\n', ' '));
+            }
+        }
+    }
+
+    private static void endStderr() {
+        System.err.println(MARKER);
+        System.err.flush();
+    }
+}
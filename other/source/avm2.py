@@ -0,0 +1,773 @@
+import struct
+
+# Multiname kinds
+CONSTANT_QNAME = 0x07
+CONSTANT_QNAME_A = 0x0D
+CONSTANT_RTQNAME = 0x0F
+CONSTANT_RTQNAME_A = 0x10
+CONSTANT_RTQNAME_L = 0x11
+CONSTANT_RTQNAME_LA = 0x12
+CONSTANT_MULTINAME = 0x09
+CONSTANT_MULTINAME_A = 0x0E
+CONSTANT_MULTINAME_L = 0x1B
+CONSTANT_MULTINAME_LA = 0x1C
+CONSTANT_TYPENAME = 0x1D
+
+# Trait kinds
+TRAIT_SLOT = 0
+TRAIT_METHOD = 1
+TRAIT_GETTER = 2
+TRAIT_SETTER = 3
+TRAIT_CLASS = 4
+TRAIT_FUNCTION = 5
+TRAIT_CONST = 6
+ATTR_METADATA = 0x04
+
+# Method info flags
+METHOD_HAS_OPTIONAL = 0x08
+METHOD_HAS_PARAM_NAMES = 0x80
+
+# Instance info flags
+INSTANCE_PROTECTED_NS = 0x08
+
+class ABCReader:
+    """Cursor over ABC bytes with the variable-length integer encodings AVM2 uses."""
+    def __init__(self, data, pos=0):
+        self.data = data
+        self.pos = pos
+
+    def u8(self):
+        value = self.data[self.pos]
+        self.pos += 1
+        return value
+
+    def u16(self):
+        value = struct.unpack_from("<H", self.data, self.pos)[0]
+        self.pos += 2
+        return value
+
+    def u32(self):
+        data = self.data
+        result = 0
+        for shift in range(0, 35, 7):
+            byte = data[self.pos]
+            self.pos += 1
+            result |= (byte & 0x7F) << shift
+            if not byte & 0x80:
+                break
+        return result & 0xFFFFFFFF
+
+    u30 = u32
+
+    def s32(self):
+        value = self.u32()
+        return value - 0x100000000 if value & 0x80000000 else value
+
+    def d64(self):
+        value = struct.unpack_from("<d", self.data, self.pos)[0]
+        self.pos += 8
+        return value
+
+    def read(self, length):
+        value = self.data[self.pos:self.pos + length]
+        self.pos += length
+        return value
+
+class Trait:
+    __slots__ = ("name", "kind", "attributes", "slot_id", "type_name", "vindex", "vkind", "index", "metadata")
+
+    def __init__(self, name, kind, attributes):
+        self.name = name
+        self.kind = kind
+        self.attributes = attributes
+        self.slot_id = 0
+        self.type_name = 0
+        self.vindex = 0
+        self.vkind = 0
+        self.index = 0
+        self.metadata = []
+
+class InstanceInfo:
+    __slots__ = ("name", "super_name", "flags", "protected_ns", "interfaces", "iinit", "traits")
+
+class ClassInfo:
+    __slots__ = ("cinit", "traits")
+
+class ScriptInfo:
+    __slots__ = ("init", "traits")
+
+class ExceptionInfo:
+    __slots__ = ("start", "end", "target", "exc_type", "var_name")
+
+class MethodBody:
+    """A method body; ``offset``/``end`` locate its bytes inside the ABC block."""
+    __slots__ = ("method", "max_stack", "local_count", "init_scope_depth", "max_scope_depth",
+                 "code", "exceptions", "traits", "offset", "code_end", "end")
+
+class ABCFile:
+    """Parsed ABC block (the payload of a DoABC/DoABC2 tag).
+
+    Everything is decoded in a single pass. The constant pool lives in plain
+    lists indexed exactly like the file (entry 0 is the implicit default), and
+    the byte span of the constant pool and of each method body is recorded so
+    a writer can reuse untouched sections verbatim.
+    """
+    def __init__(self, data):
+        self.data = memoryview(data)
+        reader = ABCReader(self.data)
+        self.minor_version = reader.u16()
+        self.major_version = reader.u16()
+        self.cpool_offset = reader.pos
+        self._read_constant_pool(reader)
+        self.cpool_end = reader.pos
+
+        self.methods_offset = reader.pos
+        self.method_count = reader.u30()
+        for _ in range(self.method_count):
+            self._skip_method_info(reader)
+
+        for _ in range(reader.u30()):
+            reader.u30()
+            for _ in range(reader.u30()):
+                reader.u30()
+                reader.u30()
+
+        class_count = reader.u30()
+        self.instances = [self._read_instance(reader) for _ in range(class_count)]
+        self.classes = []
+        for _ in range(class_count):
+            info = ClassInfo()
+            info.cinit = reader.u30()
+            info.traits = self._read_traits(reader)
+            self.classes.append(info)
+
+        self.scripts = []
+        for _ in range(reader.u30()):
+            info = ScriptInfo()
+            info.init = reader.u30()
+            info.traits = self._read_traits(reader)
+            self.scripts.append(info)
+
+        self.bodies_offset = reader.pos
+        self.method_bodies = [self._read_method_body(reader) for _ in range(reader.u30())]
+        self.body_by_method = {body.method: body for body in self.method_bodies}
+
+    def _read_constant_pool(self, reader):
+        self.ints = [0] + [reader.s32() for _ in range(max(reader.u30() - 1, 0))]
+        self.uints = [0] + [reader.u32() for _ in range(max(reader.u30() - 1, 0))]
+        self.doubles = [float("nan")] + [reader.d64() for _ in range(max(reader.u30() - 1, 0))]
+
+        self.strings = [None]
+        for _ in range(max(reader.u30() - 1, 0)):
+            length = reader.u30()
+            self.strings.append(bytes(reader.read(length)).decode("utf-8", errors="surrogateescape"))
+
+        self.namespaces_offset = reader.pos
+        self.namespaces = [(0, 0)]
+        for _ in range(max(reader.u30() - 1, 0)):
+            self.namespaces.append((reader.u8(), reader.u30()))
+
+        self.ns_sets = [()]
+        for _ in range(max(reader.u30() - 1, 0)):
+            self.ns_sets.append(tuple(reader.u30() for _ in range(reader.u30())))
+
+        self.multinames = [(0,)]
+        for _ in range(max(reader.u30() - 1, 0)):
+            kind = reader.u8()
+            if kind in (CONSTANT_QNAME, CONSTANT_QNAME_A, CONSTANT_MULTINAME, CONSTANT_MULTINAME_A):
+                self.multinames.append((kind, reader.u30(), reader.u30()))
+            elif kind in (CONSTANT_RTQNAME, CONSTANT_RTQNAME_A, CONSTANT_MULTINAME_L, CONSTANT_MULTINAME_LA):
+                self.multinames.append((kind, reader.u30()))
+            elif kind in (CONSTANT_RTQNAME_L, CONSTANT_RTQNAME_LA):
+                self.multinames.append((kind,))
+            elif kind == CONSTANT_TYPENAME:
+                qname = reader.u30()
+                params = tuple(reader.u30() for _ in range(reader.u30()))
+                self.multinames.append((kind, qname, params))
+            else:
+                raise ValueError(f"Unknown multiname kind 0x{kind:02X} at offset {reader.pos - 1}")
+
+    def _skip_method_info(self, reader):
+        param_count = reader.u30()
+        reader.u30()
+        for _ in range(param_count):
+            reader.u30()
+        reader.u30()
+        flags = reader.u8()
+        if flags & METHOD_HAS_OPTIONAL:
+            for _ in range(reader.u30()):
+                reader.u30()
+                reader.u8()
+        if flags & METHOD_HAS_PARAM_NAMES:
+            for _ in range(param_count):
+                reader.u30()
+
+    def _read_traits(self, reader):
+        traits = []
+        for _ in range(reader.u30()):
+            name = reader.u30()
+            kind_byte = reader.u8()
+            trait = Trait(name, kind_byte & 0x0F, kind_byte >> 4)
+            if trait.kind in (TRAIT_SLOT, TRAIT_CONST):
+                trait.slot_id = reader.u30()
+                trait.type_name = reader.u30()
+                trait.vindex = reader.u30()
+                if trait.vindex:
+                    trait.vkind = reader.u8()
+            elif trait.kind in (TRAIT_METHOD, TRAIT_GETTER, TRAIT_SETTER, TRAIT_CLASS, TRAIT_FUNCTION):
+                trait.slot_id = reader.u30()
+                trait.index = reader.u30()
+            else:
+                raise ValueError(f"Unknown trait kind {trait.kind} at offset {reader.pos - 1}")
+            if trait.attributes & ATTR_METADATA:
+                trait.metadata = [reader.u30() for _ in range(reader.u30())]
+            traits.append(trait)
+        return traits
+
+    def _read_instance(self, reader):
+        info = InstanceInfo()
+        info.name = reader.u30()
+        info.super_name = reader.u30()
+        info.flags = reader.u8()
+        info.protected_ns = reader.u30() if info.flags & INSTANCE_PROTECTED_NS else 0
+        info.interfaces = [reader.u30() for _ in range(reader.u30())]
+        info.iinit = reader.u30()
+        info.traits = self._read_traits(reader)
+        return info
+
+    def _read_method_body(self, reader):
+        body = MethodBody()
+        body.offset = reader.pos
+        body.method = reader.u30()
+        body.max_stack = reader.u30()
+        body.local_count = reader.u30()
+        body.init_scope_depth = reader.u30()
+        body.max_scope_depth = reader.u30()
+        body.code = reader.read(reader.u30())
+        body.code_end = reader.pos
+        body.exceptions = []
+        for _ in range(reader.u30()):
+            info = ExceptionInfo()
+            info.start = reader.u30()
+            info.end = reader.u30()
+            info.target = reader.u30()
+            info.exc_type = reader.u30()
+            info.var_name = reader.u30()
+            body.exceptions.append(info)
+        body.traits = self._read_traits(reader)
+        body.end = reader.pos
+        return body
+
+    def multiname_name(self, index):
+        """The local name of a multiname, or None for runtime names."""
+        entry = self.multinames[index]
+        kind = entry[0]
+        if kind in (CONSTANT_QNAME, CONSTANT_QNAME_A):
+            return self.strings[entry[2]]
+        if kind in (CONSTANT_MULTINAME, CONSTANT_MULTINAME_A, CONSTANT_RTQNAME, CONSTANT_RTQNAME_A):
+            return self.strings[entry[1]]
+        if kind == CONSTANT_TYPENAME:
+            return self.multiname_name(entry[1])
+        return None
+
+    def find_class(self, name):
+        """Index of the class whose local name is ``name``, or None."""
+        for index, instance in enumerate(self.instances):
+            if self.multiname_name(instance.name) == name:
+                return index
+        return None
+
+    def class_methods(self, class_index):
+        """Method indices that belong to a class: cinit, iinit and trait methods."""
+        instance = self.instances[class_index]
+        cls = self.classes[class_index]
+        methods = [cls.cinit, instance.iinit]
+        for trait in cls.traits + instance.traits:
+            if trait.kind in (TRAIT_METHOD, TRAIT_GETTER, TRAIT_SETTER, TRAIT_FUNCTION):
+                methods.append(trait.index)
+        return methods
+
+# Operand encodings: "u" u30, "b" u8, "s" s24 branch offset
+OPCODES = {
+    0x01: ("bkpt", ""), 0x02: ("nop", ""), 0x03: ("throw", ""), 0x04: ("getsuper", "u"),
+    0x05: ("setsuper", "u"), 0x06: ("dxns", "u"), 0x07: ("dxnslate", ""), 0x08: ("kill", "u"),
+    0x09: ("label", ""), 0x0C: ("ifnlt", "s"), 0x0D: ("ifnle", "s"), 0x0E: ("ifngt", "s"),
+    0x0F: ("ifnge", "s"), 0x10: ("jump", "s"), 0x11: ("iftrue", "s"), 0x12: ("iffalse", "s"),
+    0x13: ("ifeq", "s"), 0x14: ("ifne", "s"), 0x15: ("iflt", "s"), 0x16: ("ifle", "s"),
+    0x17: ("ifgt", "s"), 0x18: ("ifge", "s"), 0x19: ("ifstricteq", "s"), 0x1A: ("ifstrictne", "s"),
+    0x1B: ("lookupswitch", None), 0x1C: ("pushwith", ""), 0x1D: ("popscope", ""),
+    0x1E: ("nextname", ""), 0x1F: ("hasnext", ""), 0x20: ("pushnull", ""),
+    0x21: ("pushundefined", ""), 0x23: ("nextvalue", ""), 0x24: ("pushbyte", "b"),
+    0x25: ("pushshort", "u"), 0x26: ("pushtrue", ""), 0x27: ("pushfalse", ""),
+    0x28: ("pushnan", ""), 0x29: ("pop", ""), 0x2A: ("dup", ""), 0x2B: ("swap", ""),
+    0x2C: ("pushstring", "u"), 0x2D: ("pushint", "u"), 0x2E: ("pushuint", "u"),
+    0x2F: ("pushdouble", "u"), 0x30: ("pushscope", ""), 0x31: ("pushnamespace", "u"),
+    0x32: ("hasnext2", "uu"), 0x35: ("li8", ""), 0x36: ("li16", ""), 0x37: ("li32", ""),
+    0x38: ("lf32", ""), 0x39: ("lf64", ""), 0x3A: ("si8", ""), 0x3B: ("si16", ""),
+    0x3C: ("si32", ""), 0x3D: ("sf32", ""), 0x3E: ("sf64", ""), 0x40: ("newfunction", "u"),
+    0x41: ("call", "u"), 0x42: ("construct", "u"), 0x43: ("callmethod", "uu"),
+    0x44: ("callstatic", "uu"), 0x45: ("callsuper", "uu"), 0x46: ("callproperty", "uu"),
+    0x47: ("returnvoid", ""), 0x48: ("returnvalue", ""), 0x49: ("constructsuper", "u"),
+    0x4A: ("constructprop", "uu"), 0x4C: ("callproplex", "uu"), 0x4E: ("callsupervoid", "uu"),
+    0x4F: ("callpropvoid", "uu"), 0x50: ("sxi1", ""), 0x51: ("sxi8", ""), 0x52: ("sxi16", ""),
+    0x53: ("applytype", "u"), 0x55: ("newobject", "u"), 0x56: ("newarray", "u"),
+    0x57: ("newactivation", ""), 0x58: ("newclass", "u"), 0x59: ("getdescendants", "u"),
+    0x5A: ("newcatch", "u"), 0x5D: ("findpropstrict", "u"), 0x5E: ("findproperty", "u"),
+    0x5F: ("finddef", "u"), 0x60: ("getlex", "u"), 0x61: ("setproperty", "u"),
+    0x62: ("getlocal", "u"), 0x63: ("setlocal", "u"), 0x64: ("getglobalscope", ""),
+    0x65: ("getscopeobject", "b"), 0x66: ("getproperty", "u"), 0x67: ("getouterscope", "u"),
+    0x68: ("initproperty", "u"), 0x6A: ("deleteproperty", "u"), 0x6C: ("getslot", "u"),
+    0x6D: ("setslot", "u"), 0x6E: ("getglobalslot", "u"), 0x6F: ("setglobalslot", "u"),
+    0x70: ("convert_s", ""), 0x71: ("esc_xelem", ""), 0x72: ("esc_xattr", ""),
+    0x73: ("convert_i", ""), 0x74: ("convert_u", ""), 0x75: ("convert_d", ""),
+    0x76: ("convert_b", ""), 0x77: ("convert_o", ""), 0x78: ("checkfilter", ""),
+    0x80: ("coerce", "u"), 0x81: ("coerce_b", ""), 0x82: ("coerce_a", ""), 0x83: ("coerce_i", ""),
+    0x84: ("coerce_d", ""), 0x85: ("coerce_s", ""), 0x86: ("astype", "u"), 0x87: ("astypelate", ""),
+    0x88: ("coerce_u", ""), 0x89: ("coerce_o", ""), 0x90: ("negate", ""), 0x91: ("increment", ""),
+    0x92: ("inclocal", "u"), 0x93: ("decrement", ""), 0x94: ("declocal", "u"), 0x95: ("typeof", ""),
+    0x96: ("not", ""), 0x97: ("bitnot", ""), 0xA0: ("add", ""), 0xA1: ("subtract", ""),
+    0xA2: ("multiply", ""), 0xA3: ("divide", ""), 0xA4: ("modulo", ""), 0xA5: ("lshift", ""),
+    0xA6: ("rshift", ""), 0xA7: ("urshift", ""), 0xA8: ("bitand", ""), 0xA9: ("bitor", ""),
+    0xAA: ("bitxor", ""), 0xAB: ("equals", ""), 0xAC: ("strictequals", ""), 0xAD: ("lessthan", ""),
+    0xAE: ("lessequals", ""), 0xAF: ("greaterthan", ""), 0xB0: ("greaterequals", ""),
+    0xB1: ("instanceof", ""), 0xB2: ("istype", "u"), 0xB3: ("istypelate", ""), 0xB4: ("in", ""),
+    0xC0: ("increment_i", ""), 0xC1: ("decrement_i", ""), 0xC2: ("inclocal_i", "u"),
+    0xC3: ("declocal_i", "u"), 0xC4: ("negate_i", ""), 0xC5: ("add_i", ""),
+    0xC6: ("subtract_i", ""), 0xC7: ("multiply_i", ""), 0xD0: ("getlocal0", ""),
+    0xD1: ("getlocal1", ""), 0xD2: ("getlocal2", ""), 0xD3: ("getlocal3", ""),
+    0xD4: ("setlocal0", ""), 0xD5: ("setlocal1", ""), 0xD6: ("setlocal2", ""),
+    0xD7: ("setlocal3", ""), 0xEF: ("debug", "bubu"), 0xF0: ("debugline", "u"),
+    0xF1: ("debugfile", "u"), 0xF2: ("bkptline", "u"), 0xF3: ("timestamp", ""),
+}
+
+RUNTIME_NAME_KINDS = (CONSTANT_RTQNAME_L, CONSTANT_RTQNAME_LA, CONSTANT_MULTINAME_L, CONSTANT_MULTINAME_LA)
+RUNTIME_NS_KINDS = (CONSTANT_RTQNAME, CONSTANT_RTQNAME_A, CONSTANT_RTQNAME_L, CONSTANT_RTQNAME_LA)
+
+def iter_instructions(code):
+    """Yield ``(offset, opcode, name, operands, next_offset)`` for each instruction."""
+    reader = ABCReader(code)
+    while reader.pos < len(code):
+        offset = reader.pos
+        opcode = reader.u8()
+        if opcode not in OPCODES:
+            raise ValueError(f"Unknown opcode 0x{opcode:02X} at offset {offset}")
+        name, operand_format = OPCODES[opcode]
+        operands = []
+        if operand_format is None:
+            operands.append(_read_s24(reader))
+            case_count = reader.u30()
+            operands.append(case_count)
+            operands.extend(_read_s24(reader) for _ in range(case_count + 1))
+        else:
+            for kind in operand_format:
+                if kind == "u":
+                    operands.append(reader.u30())
+                elif kind == "b":
+                    operands.append(reader.u8())
+                else:
+                    operands.append(_read_s24(reader))
+        yield offset, opcode, name, operands, reader.pos
+
+def _read_s24(reader):
+    value = reader.u8() | (reader.u8() << 8) | (reader.u8() << 16)
+    return value - 0x1000000 if value & 0x800000 else value
+
+class _Unknown:
+    """Stack value the costume decoder does not model."""
+    def __repr__(self):
+        return "<unknown>"
+
+UNKNOWN = _Unknown()
+
+class _Global:
+    """A global looked up by name (findpropstrict/getlex), e.g. the Array class."""
+    __slots__ = ("name",)
+
+    def __init__(self, name):
+        self.name = name
+
+class CostumeTable:
+    """Costume table rebuilt from the method that fills ``_loc1_[character].push({...})``.
+
+    ``characters`` maps each character to its list of costume dicts in script
+    order. ``statements`` holds the ``(start, end)`` code offsets of every
+    statement that builds the table, which is what a writer has to replace.
+    """
+    def __init__(self, body, register, characters, statements, templates):
+        self.body = body
+        self.register = register
+        self.characters = characters
+        self.statements = statements
+        self.templates = templates
+
+    @property
+    def code_start(self):
+        return self.statements[0][0]
+
+    @property
+    def code_end(self):
+        return self.statements[-1][1]
+
+def _number(value):
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+def _decode_table_body(abc, body):
+    """Symbolically execute a straight-line method body and return its costume table."""
+    stack = []
+    registers = {}
+    tables = {}
+    statements = []
+    templates = {}
+    statement_start = 0
+    touched_table = False
+
+    def pop(count=1):
+        if count == 0:
+            return []
+        if len(stack) < count:
+            raise ValueError("Stack underflow while decoding costume table")
+        values = stack[-count:]
+        del stack[-count:]
+        return values
+
+    def pop_name(index):
+        entry = abc.multinames[index]
+        name = pop()[0] if entry[0] in RUNTIME_NAME_KINDS else abc.multiname_name(index)
+        if entry[0] in RUNTIME_NS_KINDS:
+            pop()
+        return name
+
+    def table_of(obj):
+        return next((register for register, table in tables.items() if table is obj), None)
+
+    for offset, opcode, name, operands, next_offset in iter_instructions(body.code):
+        if name in ("getlocal0", "getlocal1", "getlocal2", "getlocal3"):
+            stack.append(registers.get(opcode - 0xD0, UNKNOWN))
+        elif name == "getlocal":
+            stack.append(registers.get(operands[0], UNKNOWN))
+        elif name in ("setlocal0", "setlocal1", "setlocal2", "setlocal3", "setlocal"):
+            register = operands[0] if name == "setlocal" else opcode - 0xD4
+            value = pop()[0]
+            registers[register] = value
+            if isinstance(value, dict):
+                tables[register] = value
+        elif name == "pushbyte":
+            stack.append(operands[0] - 0x100 if operands[0] & 0x80 else operands[0])
+        elif name == "pushshort":
+            value = operands[0] & 0xFFFF
+            stack.append(value - 0x10000 if value & 0x8000 else value)
+        elif name == "pushint":
+            stack.append(abc.ints[operands[0]])
+        elif name == "pushuint":
+            stack.append(abc.uints[operands[0]])
+        elif name == "pushdouble":
+            stack.append(_number(abc.doubles[operands[0]]))
+        elif name == "pushstring":
+            stack.append(abc.strings[operands[0]])
+        elif name == "pushtrue":
+            stack.append(True)
+        elif name == "pushfalse":
+            stack.append(False)
+        elif name in ("pushnull", "pushundefined"):
+            stack.append(None)
+        elif name == "pushnan":
+            stack.append(float("nan"))
+        elif name in ("negate", "negate_i"):
+            value = pop()[0]
+            stack.append(-value if isinstance(value, (int, float)) and not isinstance(value, bool) else UNKNOWN)
+        elif name in ("convert_i", "coerce_i"):
+            value = pop()[0]
+            stack.append(((int(value) + 0x80000000) & 0xFFFFFFFF) - 0x80000000 if isinstance(value, (int, float)) and value == value else value)
+        elif name in ("convert_u", "coerce_u"):
+            value = pop()[0]
+            stack.append(int(value) & 0xFFFFFFFF if isinstance(value, (int, float)) and value == value else value)
+        elif name in ("convert_s", "coerce_s", "convert_d", "coerce_d", "convert_b", "coerce_b",
+                      "convert_o", "coerce_o", "coerce_a", "coerce", "astype", "checkfilter"):
+            pass
+        elif name in ("pushscope", "pop"):
+            pop()
+        elif name == "dup":
+            stack.append(pop()[0])
+            stack.append(stack[-1])
+        elif name == "swap":
+            first, second = pop(2)
+            stack.extend((second, first))
+        elif name in ("findpropstrict", "findproperty", "getlex", "finddef"):
+            stack.append(_Global(abc.multiname_name(operands[0])))
+        elif name in ("getglobalscope", "getscopeobject", "getouterscope", "newactivation"):
+            stack.append(UNKNOWN)
+        elif name == "newobject":
+            values = pop(2 * operands[0])
+            stack.append({values[i]: values[i + 1] for i in range(0, len(values), 2)})
+        elif name == "newarray":
+            stack.append(pop(operands[0]))
+        elif name in ("constructprop", "construct"):
+            args = pop(operands[-1])
+            target = pop_name(operands[0]) if name == "constructprop" else None
+            obj = pop()[0]
+            if name == "construct" and isinstance(obj, _Global):
+                target = obj.name
+            if target == "Array":
+                stack.append(args if len(args) != 1 else [])
+                if name == "constructprop":
+                    templates.setdefault("array", operands[0])
+            elif target == "Object":
+                stack.append({})
+            else:
+                stack.append(UNKNOWN)
+        elif name == "getproperty":
+            property_name = pop_name(operands[0])
+            obj = pop()[0]
+            if table_of(obj) is not None:
+                templates.setdefault("get", operands[0])
+            stack.append(obj.get(property_name, UNKNOWN) if isinstance(obj, dict) else UNKNOWN)
+        elif name in ("setproperty", "initproperty"):
+            value = pop()[0]
+            property_name = pop_name(operands[0])
+            obj = pop()[0]
+            if isinstance(obj, dict):
+                obj[property_name] = value
+                if table_of(obj) is not None:
+                    touched_table = True
+                    templates.setdefault("set", operands[0])
+        elif name in ("callpropvoid", "callproperty", "callproplex"):
+            args = pop(operands[1])
+            property_name = pop_name(operands[0])
+            obj = pop()[0]
+            if property_name == "push" and isinstance(obj, list):
+                obj.extend(args)
+                if any(obj is chars for table in tables.values() for chars in table.values()):
+                    touched_table = True
+                    templates.setdefault("push", operands[0])
+            if name != "callpropvoid":
+                stack.append(UNKNOWN)
+        elif name in ("returnvoid", "returnvalue"):
+            break
+        elif name in ("debug", "debugline", "debugfile", "bkptline", "timestamp", "label", "nop", "kill"):
+            pass
+        else:
+            raise ValueError(f"Unsupported instruction '{name}' at offset {offset} in costume method")
+
+        if not stack:
+            if touched_table:
+                statements.append((statement_start, next_offset))
+                touched_table = False
+            statement_start = next_offset
+
+    return registers, tables, statements, templates
+
+def _is_costume_table(table):
+    if not table:
+        return False
+    for costumes in table.values():
+        if not isinstance(costumes, list):
+            return False
+        if any(isinstance(costume, dict) and "paletteSwap" in costume for costume in costumes):
+            return True
+    return False
+
+def decode_costume_table(abc, class_name="Misc"):
+    """Rebuild the character -> costumes table from the bytecode of ``class_name``."""
+    class_index = abc.find_class(class_name)
+    if class_index is None:
+        raise ValueError(f"Class {class_name} not found in ABC block")
+    try:
+        palette_index = abc.strings.index("paletteSwap")
+    except ValueError:
+        raise ValueError("ABC block has no paletteSwap constant")
+
+    for method in abc.class_methods(class_index):
+        body = abc.body_by_method.get(method)
+        if body is None:
+            continue
+        if not any(name == "pushstring" and operands[0] == palette_index
+                   for _, _, name, operands, _ in iter_instructions(body.code)):
+            continue
+        if body.exceptions:
+            raise ValueError("Costume method has exception handlers; refusing to decode it natively")
+        registers, tables, statements, templates = _decode_table_body(abc, body)
+        for register, table in tables.items():
+            if _is_costume_table(table):
+                characters = {name: [_normalise(costume) for costume in costumes]
+                              for name, costumes in table.items() if isinstance(costumes, list)}
+                return CostumeTable(body, register, characters, statements, templates)
+    raise ValueError(f"No costume table found in class {class_name}")
+
+def _normalise(value):
+    if isinstance(value, dict):
+        return {key: _normalise(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_normalise(item) for item in value]
+    if value is UNKNOWN or isinstance(value, _Global):
+        raise ValueError("Costume table contains a value computed at runtime")
+    return _number(value)
+
+def encode_u30(value):
+    value &= 0xFFFFFFFF
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+class ConstantPoolBuilder:
+    """Appends constants to an existing pool so every index already in use stays valid."""
+    def __init__(self, abc):
+        self.abc = abc
+        self.ints = list(abc.ints)
+        self.uints = list(abc.uints)
+        self.doubles = list(abc.doubles)
+        self.strings = list(abc.strings)
+        self._lookup = {
+            "int": {value: i for i, value in enumerate(self.ints) if i},
+            "uint": {value: i for i, value in enumerate(self.uints) if i},
+            "double": {struct.pack("<d", value): i for i, value in enumerate(self.doubles) if i},
+            "string": {value: i for i, value in enumerate(self.strings) if i},
+        }
+
+    def _index(self, kind, pool, key, value):
+        lookup = self._lookup[kind]
+        if key not in lookup:
+            lookup[key] = len(pool)
+            pool.append(value)
+        return lookup[key]
+
+    def int(self, value):
+        return self._index("int", self.ints, value, value)
+
+    def uint(self, value):
+        return self._index("uint", self.uints, value, value)
+
+    def double(self, value):
+        return self._index("double", self.doubles, struct.pack("<d", value), value)
+
+    def string(self, value):
+        return self._index("string", self.strings, value, value)
+
+    def serialize(self):
+        """The new constant pool; namespaces, ns sets and multinames are copied verbatim."""
+        out = bytearray()
+        out += encode_u30(len(self.ints) if len(self.ints) > 1 else 0)
+        for value in self.ints[1:]:
+            out += encode_u30(value)
+        out += encode_u30(len(self.uints) if len(self.uints) > 1 else 0)
+        for value in self.uints[1:]:
+            out += encode_u30(value)
+        out += encode_u30(len(self.doubles) if len(self.doubles) > 1 else 0)
+        for value in self.doubles[1:]:
+            out += struct.pack("<d", value)
+        out += encode_u30(len(self.strings) if len(self.strings) > 1 else 0)
+        for value in self.strings[1:]:
+            data = value.encode("utf-8", errors="surrogateescape")
+            out += encode_u30(len(data)) + data
+        out += self.abc.data[self.abc.namespaces_offset:self.abc.cpool_end]
+        return bytes(out)
+
+class _CodeEmitter:
+    """Builds straight-line bytecode and tracks the operand stack depth."""
+    def __init__(self, pool):
+        self.pool = pool
+        self.code = bytearray()
+        self.depth = 0
+        self.max_depth = 0
+
+    def op(self, opcode, *operands, stack=0):
+        self.code.append(opcode)
+        for operand in operands:
+            self.code += encode_u30(operand)
+        self.depth += stack
+        self.max_depth = max(self.max_depth, self.depth)
+
+    def getlocal(self, register):
+        if register < 4:
+            self.op(0xD0 + register, stack=1)
+        else:
+            self.op(0x62, register, stack=1)
+
+    def value(self, value):
+        if isinstance(value, bool):
+            self.op(0x26 if value else 0x27, stack=1)
+        elif value is None:
+            self.op(0x20, stack=1)
+        elif isinstance(value, str):
+            self.op(0x2C, self.pool.string(value), stack=1)
+        elif isinstance(value, int) and -0x80 <= value < 0x80:
+            self.code += bytes((0x24, value & 0xFF))
+            self.depth += 1
+            self.max_depth = max(self.max_depth, self.depth)
+        elif isinstance(value, int) and -0x80000000 <= value < 0x80000000:
+            self.op(0x2D, self.pool.int(value), stack=1)
+        elif isinstance(value, int) and 0 <= value <= 0xFFFFFFFF:
+            self.op(0x2E, self.pool.uint(value), stack=1)
+        elif isinstance(value, (int, float)):
+            if value != value:
+                self.op(0x28, stack=1)
+            else:
+                self.op(0x2F, self.pool.double(float(value)), stack=1)
+        elif isinstance(value, list):
+            for item in value:
+                self.value(item)
+            self.op(0x56, len(value), stack=1 - len(value))
+        elif isinstance(value, dict):
+            for key, item in value.items():
+                self.op(0x2C, self.pool.string(str(key)), stack=1)
+                self.value(item)
+            self.op(0x55, len(value), stack=1 - 2 * len(value))
+        else:
+            raise ValueError(f"Cannot encode costume value of type {type(value).__name__}")
+
+_FILLER_INSTRUCTIONS = ("debug", "debugline", "debugfile", "bkptline", "nop", "label", "timestamp")
+
+def encode_costume_table(abc, table, characters):
+    """Return new ABC bytes with the costume statements of ``table`` regenerated from ``characters``.
+
+    Only the constant pool (new entries are appended) and the costume method
+    body change; every other section is copied from the original block.
+    """
+    for key in ("set", "get", "push"):
+        if key not in table.templates:
+            raise ValueError(f"Costume method has no '{key}' instruction to reuse")
+    # The character name is pushed as a runtime name, which only a late-bound multiname pops
+    for key in ("set", "get"):
+        if abc.multinames[table.templates[key]][0] not in (CONSTANT_MULTINAME_L, CONSTANT_MULTINAME_LA):
+            raise ValueError(f"Costume method's '{key}' instruction does not take a runtime name")
+    body = table.body
+    statements = table.statements
+    for (_, previous_end), (next_start, _) in zip(statements, statements[1:]):
+        gap = body.code[previous_end:next_start]
+        if any(name not in _FILLER_INSTRUCTIONS for _, _, name, _, _ in iter_instructions(gap)):
+            raise ValueError("Costume statements are interleaved with other code; refusing to rewrite them")
+
+    pool = ConstantPoolBuilder(abc)
+    emitter = _CodeEmitter(pool)
+    for character, costumes in characters.items():
+        emitter.getlocal(table.register)
+        emitter.value(character)
+        emitter.op(0x56, 0, stack=1)
+        emitter.op(0x61, table.templates["set"], stack=-3)
+        for costume in costumes:
+            emitter.getlocal(table.register)
+            emitter.value(character)
+            emitter.op(0x66, table.templates["get"], stack=-1)
+            emitter.value(costume)
+            emitter.op(0x4F, table.templates["push"], 1, stack=-2)
+
+    code = bytes(body.code[:table.code_start]) + bytes(emitter.code) + bytes(body.code[table.code_end:])
+    data = abc.data
+    new_body = (encode_u30(body.method) + encode_u30(max(body.max_stack, emitter.max_depth))
+                + encode_u30(body.local_count) + encode_u30(body.init_scope_depth)
+                + encode_u30(body.max_scope_depth) + encode_u30(len(code)) + code
+                + bytes(data[body.code_end:body.end]))
+    return b"".join((
+        bytes(data[:abc.cpool_offset]),
+        pool.serialize(),
+        bytes(data[abc.cpool_end:body.offset]),
+        new_body,
+        bytes(data[body.end:]),
+    ))
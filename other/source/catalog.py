@@ -0,0 +1,550 @@
+import argparse
+import glob
+import hashlib
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+from array import array
+
+from costume import Costume
+
+CATALOG_MAGIC = b"SSFC"
+CATALOG_VERSION = 1
+CATALOG_EXTENSION = ".ssfc"
+MANIFEST_NAME = "catalog-manifest.json"
+# Where compiled <character>.ssfc files live, relative to the catalog root
+BINARY_CATALOG_DIR = "catalog"
+MANIFEST_VERSION = 1
+
+# magic, version, string/array/palette/layout/character/costume counts, section offsets
+_HEADER = struct.Struct("<4sH2x6I8I")
+_ARRAY = struct.Struct("<III")       # pool offset (in uint32s), length, encoding
+_PALETTE = struct.Struct("<III")     # colors array, replacements array, replacements-first flag
+_CHARACTER = struct.Struct("<III")   # name string, first costume, costume count
+_COSTUME = struct.Struct("<II")      # layout array, value pool offset (in uint32s)
+
+# How the entries of a palette array were written in the source catalog.
+SIGNED, UNSIGNED, HEX, MIXED = range(4)
+
+# Value tags: a string, any other JSON value (kept as JSON text), or a palette.
+TAG_STRING, TAG_JSON, TAG_PALETTE = range(3)
+
+def _color_encoding(value):
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        if -0x80000000 <= value < 0:
+            return SIGNED
+        return UNSIGNED if 0 <= value <= 0xFFFFFFFF else None
+    if isinstance(value, str) and len(value) == 10 and value.startswith("0x"):
+        try:
+            int(value[2:], 16)
+        except ValueError:
+            return None
+        return HEX if value == f"0x{int(value[2:], 16):08X}" else None
+    return None
+
+def _pack_color(value):
+    return int(value, 16) if isinstance(value, str) else value & 0xFFFFFFFF
+
+def _format_color(value, encoding):
+    if encoding == HEX:
+        return f"0x{value:08X}"
+    if encoding == SIGNED and value & 0x80000000:
+        return value - 0x100000000
+    return value
+
+class CatalogCompiler:
+    """Packs costume catalogs (lists of costume dicts) into one binary catalog.
+
+    Strings (``info``, ``author``, key names, ...) go to a shared string
+    table, palette entries to a uint32 pool, and identical arrays,
+    palettes and key layouts are stored once, so the ``colors`` arrays
+    every costume of a character repeats take no extra space.
+    """
+    def __init__(self):
+        self.strings = []
+        self._string_ids = {}
+        self.pool = array("I")
+        self.arrays = []
+        self._array_ids = {}
+        self.palettes = []
+        self._palette_ids = {}
+        self.layouts = []
+        self._layout_ids = {}
+        self.characters = []
+        self.costumes = []
+        self.values = array("I")
+
+    def string(self, text):
+        index = self._string_ids.get(text)
+        if index is None:
+            index = self._string_ids[text] = len(self.strings)
+            self.strings.append(text)
+        return index
+
+    def _array(self, packed, encoding, flags=None):
+        key = (packed.tobytes(), encoding, flags.tobytes() if flags is not None else b"")
+        index = self._array_ids.get(key)
+        if index is None:
+            index = self._array_ids[key] = len(self.arrays)
+            self.arrays.append((len(self.pool), len(packed), encoding))
+            self.pool.extend(packed)
+            if flags is not None:
+                self.pool.extend(flags)
+        return index
+
+    def color_array(self, values):
+        """Array index for a list of palette entries, or None if one is not a colour."""
+        encodings = [_color_encoding(value) for value in values]
+        if None in encodings:
+            return None
+        packed = array("I", map(_pack_color, values))
+        kinds = set(encodings)
+        if len(kinds) <= 1:
+            return self._array(packed, kinds.pop() if kinds else SIGNED)
+        return self._array(packed, MIXED, array("I", encodings))
+
+    def palette(self, value):
+        """Palette index for a ``{"colors": [...], "replacements": [...]}`` dict, or None."""
+        if not isinstance(value, dict) or set(value) != {"colors", "replacements"}:
+            return None
+        if not isinstance(value["colors"], list) or not isinstance(value["replacements"], list):
+            return None
+        colors = self.color_array(value["colors"])
+        replacements = self.color_array(value["replacements"])
+        if colors is None or replacements is None:
+            return None
+        key = (colors, replacements, int(next(iter(value)) == "replacements"))
+        index = self._palette_ids.get(key)
+        if index is None:
+            index = self._palette_ids[key] = len(self.palettes)
+            self.palettes.append(key)
+        return index
+
+    def layout(self, keys):
+        names = array("I", map(self.string, keys))
+        key = names.tobytes()
+        index = self._layout_ids.get(key)
+        if index is None:
+            index = self._layout_ids[key] = len(self.layouts)
+            self.layouts.append(self._array(names, UNSIGNED))
+        return index
+
+    def add_character(self, name, costumes):
+        first = len(self.costumes)
+        for costume in costumes:
+            if not isinstance(costume, dict):
+                raise ValueError(f"Costume {len(self.costumes) - first} of {name} is not an object")
+            self.costumes.append((self.layout(costume), len(self.values)))
+            for value in costume.values():
+                palette = self.palette(value)
+                if palette is not None:
+                    self.values.extend((TAG_PALETTE, palette))
+                elif isinstance(value, str):
+                    self.values.extend((TAG_STRING, self.string(value)))
+                else:
+                    self.values.extend((TAG_JSON, self.string(json.dumps(value))))
+        self.characters.append((self.string(name), first, len(self.costumes) - first))
+
+    def to_bytes(self):
+        def u32(values):
+            values = array("I", values)
+            if sys.byteorder != "little":
+                values.byteswap()
+            return values.tobytes()
+
+        encoded = [text.encode("utf-8") for text in self.strings]
+        offsets = [0]
+        for text in encoded:
+            offsets.append(offsets[-1] + len(text))
+        blob = b"".join(encoded)
+        blob += b"\x00" * (-len(blob) % 4)
+        sections = [
+            u32(offsets) + blob,
+            b"".join(_ARRAY.pack(*entry) for entry in self.arrays),
+            b"".join(_PALETTE.pack(*entry) for entry in self.palettes),
+            u32(self.layouts),
+            b"".join(_CHARACTER.pack(*entry) for entry in self.characters),
+            b"".join(_COSTUME.pack(*entry) for entry in self.costumes),
+            u32(self.values),
+            u32(self.pool),
+        ]
+        section_offsets = []
+        position = _HEADER.size
+        for section in sections:
+            section_offsets.append(position)
+            position += len(section)
+        header = _HEADER.pack(CATALOG_MAGIC, CATALOG_VERSION, len(self.strings), len(self.arrays), len(self.palettes),
+                              len(self.layouts), len(self.characters), len(self.costumes), *section_offsets)
+        return header + b"".join(sections)
+
+class CostumeCatalog:
+    """Reads a binary catalog in place, building costume dicts on demand.
+
+    ``data`` is any buffer (bytes from a download, or the mmap that
+    open() maps); only the records a lookup touches are decoded.
+    """
+    def __init__(self, data):
+        self.data = memoryview(data)
+        fields = _HEADER.unpack_from(self.data, 0)
+        magic, version = fields[:2]
+        if magic != CATALOG_MAGIC:
+            raise ValueError(f"Not a costume catalog (magic {bytes(magic)!r})")
+        if version != CATALOG_VERSION:
+            raise ValueError(f"Unsupported costume catalog version {version}")
+        (self.string_count, self.array_count, self.palette_count,
+         self.layout_count, self.character_count, self.costume_count) = fields[2:8]
+        (self._strings_at, self._arrays_at, self._palettes_at, self._layouts_at,
+         self._characters_at, self._costumes_at, self._values_at, self._pool_at) = fields[8:]
+        self._blob_at = self._strings_at + 4 * (self.string_count + 1)
+        self._string_cache = {}
+        self._characters = {}
+        for index in range(self.character_count):
+            name, first, count = _CHARACTER.unpack_from(self.data, self._characters_at + index * _CHARACTER.size)
+            self._characters[self.string(name)] = (first, count)
+        self._file = None
+        self._mmap = None
+
+    @classmethod
+    def open(cls, path):
+        """Memory-map a catalog file; close() (or a with block) unmaps it."""
+        f = open(path, "rb")
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            f.close()
+            raise
+        catalog = cls(mapped)
+        catalog._file, catalog._mmap = f, mapped
+        return catalog
+
+    def close(self):
+        self.data.release()
+        if self._mmap is not None:
+            self._mmap.close()
+            self._file.close()
+            self._mmap = self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _u32(self, offset, count, typecode="I"):
+        values = array(typecode)
+        values.frombytes(self.data[offset:offset + 4 * count])
+        if sys.byteorder != "little":
+            values.byteswap()
+        return values
+
+    def string(self, index):
+        text = self._string_cache.get(index)
+        if text is None:
+            start, end = struct.unpack_from("<II", self.data, self._strings_at + 4 * index)
+            text = self._string_cache[index] = str(self.data[self._blob_at + start:self._blob_at + end], "utf-8")
+        return text
+
+    def array(self, index):
+        offset, length, encoding = _ARRAY.unpack_from(self.data, self._arrays_at + index * _ARRAY.size)
+        offset = self._pool_at + 4 * offset
+        if encoding == SIGNED:
+            return self._u32(offset, length, "i").tolist()
+        values = self._u32(offset, length)
+        if encoding == UNSIGNED:
+            return values.tolist()
+        if encoding == HEX:
+            return [f"0x{value:08X}" for value in values]
+        flags = self._u32(offset + 4 * length, length)
+        return [_format_color(value, flag) for value, flag in zip(values, flags)]
+
+    def palette(self, index):
+        colors, replacements, replacements_first = _PALETTE.unpack_from(self.data, self._palettes_at + index * _PALETTE.size)
+        if replacements_first:
+            return {"replacements": self.array(replacements), "colors": self.array(colors)}
+        return {"colors": self.array(colors), "replacements": self.array(replacements)}
+
+    def characters(self):
+        return list(self._characters)
+
+    def __contains__(self, character):
+        return character in self._characters
+
+    def count(self, character):
+        return self._characters[character][1]
+
+    def costume(self, character, position):
+        """The costume dict at ``position`` in ``character``'s list, as the source catalog wrote it."""
+        first, count = self._characters[character]
+        if not 0 <= position < count:
+            raise IndexError(f"{character} has {count} costumes, no costume {position}")
+        layout, values_offset = _COSTUME.unpack_from(self.data, self._costumes_at + (first + position) * _COSTUME.size)
+        layout_array = struct.unpack_from("<I", self.data, self._layouts_at + 4 * layout)[0]
+        keys = [self.string(index) for index in self.array(layout_array)]
+        values = self._u32(self._values_at + 4 * values_offset, 2 * len(keys))
+        costume = {}
+        for i, key in enumerate(keys):
+            tag, ref = values[2 * i], values[2 * i + 1]
+            if tag == TAG_PALETTE:
+                costume[key] = self.palette(ref)
+            elif tag == TAG_STRING:
+                costume[key] = self.string(ref)
+            else:
+                costume[key] = json.loads(self.string(ref))
+        return costume
+
+    def costumes(self, character):
+        return [self.costume(character, position) for position in range(self.count(character))]
+
+def compile_catalog(catalogs):
+    """Binary catalog bytes for ``{character: [costume, ...]}``."""
+    compiler = CatalogCompiler()
+    for character, costumes in catalogs.items():
+        compiler.add_character(character, costumes)
+    return compiler.to_bytes()
+
+def compile_catalog_files(root, out_dir):
+    """Compile every ``<character>.as`` under ``root`` to ``out_dir/<character>.ssfc``.
+
+    Returns ``(character, source size, catalog size)`` for each file written.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    results = []
+    for path in sorted(glob.glob(os.path.join(root, "*.as"))):
+        character = os.path.splitext(os.path.basename(path))[0]
+        with open(path, "r", encoding="utf-8") as f:
+            costumes = json.load(f)
+        data = compile_catalog({character: costumes})
+        out_path = os.path.join(out_dir, character + CATALOG_EXTENSION)
+        with open(out_path, "wb") as f:
+            f.write(data)
+        results.append((character, os.path.getsize(path), len(data)))
+    return results
+
+_JSON_WHITESPACE = re.compile(r"[ \t\r\n]*")
+
+def _array_spans(text, pos, decoder):
+    """``(start, end, value)`` of each element of the JSON array at ``text[pos]``, and the position after it."""
+    if text[pos] != "[":
+        raise ValueError(f"Expected a JSON array at offset {pos}")
+    spans = []
+    pos = _JSON_WHITESPACE.match(text, pos + 1).end()
+    if text[pos] == "]":
+        return spans, pos + 1
+    while True:
+        value, end = decoder.raw_decode(text, pos)
+        spans.append((pos, end, value))
+        pos = _JSON_WHITESPACE.match(text, end).end()
+        if text[pos] == "]":
+            return spans, pos + 1
+        if text[pos] != ",":
+            raise ValueError(f"Expected ',' or ']' at offset {pos}")
+        pos = _JSON_WHITESPACE.match(text, pos + 1).end()
+
+def _object_members(text, pos, decoder):
+    """Yield ``(key, value position)`` for the JSON object at ``text[pos]``; the caller consumes each value
+    and sends back the position after it."""
+    if text[pos] != "{":
+        raise ValueError(f"Expected a JSON object at offset {pos}")
+    pos = _JSON_WHITESPACE.match(text, pos + 1).end()
+    if text[pos] == "}":
+        return
+    while True:
+        key, pos = decoder.raw_decode(text, pos)
+        pos = _JSON_WHITESPACE.match(text, pos).end()
+        if text[pos] != ":":
+            raise ValueError(f"Expected ':' at offset {pos}")
+        pos = yield key, _JSON_WHITESPACE.match(text, pos + 1).end()
+        pos = _JSON_WHITESPACE.match(text, pos).end()
+        if text[pos] == "}":
+            return
+        if text[pos] != ",":
+            raise ValueError(f"Expected ',' or '}}' at offset {pos}")
+        pos = _JSON_WHITESPACE.match(text, pos + 1).end()
+
+def catalog_costume_spans(text, pack=False):
+    """``{character: [(start, end, costume), ...]}`` with character offsets into ``text``.
+
+    A root catalog is one JSON array (keyed by ``None``); a pack keeps its
+    costume arrays under ``"characters"``.
+    """
+    decoder = json.JSONDecoder()
+    pos = _JSON_WHITESPACE.match(text).end()
+    if not pack:
+        return {None: _array_spans(text, pos, decoder)[0]}
+    characters = {}
+    members = _object_members(text, pos, decoder)
+    try:
+        key, pos = next(members)
+        while True:
+            if key == "characters":
+                inner = _object_members(text, pos, decoder)
+                try:
+                    character, pos = next(inner)
+                    while True:
+                        characters[character], pos = _array_spans(text, pos, decoder)
+                        character, pos = inner.send(pos)
+                except StopIteration:
+                    pos = _JSON_WHITESPACE.match(text, pos).end() + 1
+            else:
+                pos = decoder.raw_decode(text, pos)[1]
+            key, pos = members.send(pos)
+    except StopIteration:
+        pass
+    return characters
+
+def _manifest_catalog(data, pack=False):
+    """Manifest entry for one catalog file's bytes."""
+    bom = 3 if data.startswith(b"\xef\xbb\xbf") else 0
+    text = data[bom:].decode("utf-8")
+    characters = {}
+    byte_pos, char_pos = bom, 0
+    for character, spans in catalog_costume_spans(text, pack).items():
+        costumes = []
+        for start, end, costume in spans:
+            # Offsets are kept in bytes so a reader can seek or send an HTTP Range request.
+            byte_pos += len(text[char_pos:start].encode("utf-8"))
+            length = len(text[start:end].encode("utf-8"))
+            try:
+                digest = Costume.from_dict(costume).palette_digest()[:16]
+            except (ValueError, AttributeError, TypeError):
+                digest = None
+            costumes.append([byte_pos, length, digest])
+            byte_pos, char_pos = byte_pos + length, end
+        characters[character] = {"count": len(costumes), "costumes": costumes}
+    return {"size": len(data), "sha256": hashlib.sha256(data).hexdigest(),
+            "count": sum(entry["count"] for entry in characters.values()), "characters": characters}
+
+def build_manifest(root):
+    """Manifest of every root ``<character>.as`` catalog and ``packs/*.json`` pack under ``root``.
+
+    Each costume is recorded as ``[byte offset, byte length, palette hash]``
+    where the palette hash is the first 16 hex digits of
+    Costume.palette_digest() (None if the costume has no valid palettes).
+
+    ``binaries`` lists the compiled ``catalog/<character>.ssfc`` files that
+    are byte-identical to compiling their ``.as`` source now; stale ones
+    are left out so readers fall back to the source catalog.
+    """
+    catalogs = {}
+    binaries = {}
+    for path in sorted(glob.glob(os.path.join(root, "*.as"))):
+        with open(path, "rb") as f:
+            data = f.read()
+        entry = _manifest_catalog(data)
+        character = os.path.splitext(os.path.basename(path))[0]
+        entry["characters"] = {character: entry["characters"][None]}
+        catalogs[os.path.basename(path)] = entry
+
+        binary_name = f"{BINARY_CATALOG_DIR}/{character}{CATALOG_EXTENSION}"
+        try:
+            with open(os.path.join(root, binary_name), "rb") as f:
+                binary = f.read()
+        except OSError:
+            continue
+        if binary != compile_catalog({character: json.loads(data.decode("utf-8-sig"))}):
+            print(f"{binary_name} is out of date with {os.path.basename(path)}, leaving it out")
+            continue
+        binaries[binary_name] = {"source": os.path.basename(path), "size": len(binary),
+                                 "sha256": hashlib.sha256(binary).hexdigest()}
+    for path in sorted(glob.glob(os.path.join(root, "packs", "*.json"))):
+        with open(path, "rb") as f:
+            catalogs["packs/" + os.path.basename(path)] = _manifest_catalog(f.read(), pack=True)
+    return {"version": MANIFEST_VERSION, "catalogs": catalogs, "binaries": binaries}
+
+def write_manifest(root, path=None):
+    """Write build_manifest(root) with one catalog per line, so regenerating it gives readable diffs."""
+    manifest = build_manifest(root)
+    def section(entries):
+        lines = [f"    {json.dumps(name)}: {json.dumps(entry, separators=(',', ':'))}" for name, entry in entries.items()]
+        return "{\n" + ",\n".join(lines) + "\n  }" if lines else "{}"
+
+    text = (f'{{\n  "version": {manifest["version"]},\n  "catalogs": {section(manifest["catalogs"])},\n'
+            f'  "binaries": {section(manifest["binaries"])}\n}}\n')
+    path = path or os.path.join(root, MANIFEST_NAME)
+    with open(path, "w", encoding="utf-8", newline="\n") as f:
+        f.write(text)
+    return manifest
+
+class CatalogManifest:
+    """Lookups over a parsed catalog-manifest.json.
+
+    A character resolves to its root ``<character>.as`` catalog, and to a
+    compiled ``.ssfc`` only when ``binaries`` lists one; packs are listed
+    but only reached through catalog().
+    """
+    def __init__(self, manifest):
+        if manifest.get("version") != MANIFEST_VERSION:
+            raise ValueError(f"Unsupported catalog manifest version {manifest.get('version')}")
+        self.catalogs = manifest["catalogs"]
+        self.binaries = manifest.get("binaries", {})
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def catalog(self, name):
+        return self.catalogs.get(name)
+
+    def catalog_name(self, character):
+        name = character + ".as"
+        return name if name in self.catalogs else None
+
+    def binary_name(self, character):
+        """Path of the character's compiled catalog, or None if the manifest lists no current one."""
+        name = f"{BINARY_CATALOG_DIR}/{character}{CATALOG_EXTENSION}"
+        entry = self.binaries.get(name)
+        return name if entry is not None and entry["source"] == self.catalog_name(character) else None
+
+    def count(self, character):
+        """Number of costumes in the character's catalog, or None if it has none."""
+        name = self.catalog_name(character)
+        return self.catalogs[name]["count"] if name else None
+
+    def is_current(self, name, data):
+        """True if ``data`` (a catalog's or compiled catalog's bytes) is the version this manifest describes."""
+        entry = self.catalogs.get(name) or self.binaries.get(name)
+        return entry is not None and entry["size"] == len(data) and entry["sha256"] == hashlib.sha256(data).hexdigest()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the binary catalogs and the catalog manifest from the costume catalogs.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    compile_parser = commands.add_parser("compile", help="compile <character>.as catalogs to <character>.ssfc files")
+    compile_parser.add_argument("root", help="directory holding the <character>.as catalogs")
+    compile_parser.add_argument("out_dir", nargs="?", help=f"directory to write <character>.ssfc files to (default: <root>/{BINARY_CATALOG_DIR})")
+    manifest_parser = commands.add_parser("manifest", help=f"write {MANIFEST_NAME}; run after compile so it lists the .ssfc files")
+    manifest_parser.add_argument("root", help="directory holding the <character>.as catalogs and packs/")
+    manifest_parser.add_argument("-o", "--output", help=f"manifest path (default: <root>/{MANIFEST_NAME})")
+    check_parser = commands.add_parser("check-sync", help="check that syncing each <character>.as twice adds nothing the second time")
+    check_parser.add_argument("root", help="directory holding the <character>.as catalogs")
+    args = parser.parse_args(argv)
+    if args.command == "check-sync":
+        # utils pulls in the GUI toolkit and network stack, so only load it for this command
+        from utils import check_sync_idempotent
+        failures = []
+        for path in sorted(glob.glob(os.path.join(args.root, "*.as"))):
+            character = os.path.splitext(os.path.basename(path))[0]
+            added = check_sync_idempotent(path, character)
+            if added:
+                failures.append(f"{character}: second sync added {added} costumes")
+        print("\n".join(failures) or "Every catalog syncs idempotently")
+        sys.exit(1 if failures else 0)
+    if args.command == "manifest":
+        manifest = write_manifest(args.root, args.output)
+        total = sum(entry["count"] for entry in manifest["catalogs"].values())
+        print(f"Wrote manifest of {len(manifest['catalogs'])} catalogs, {total} costumes")
+        return
+    results = compile_catalog_files(args.root, args.out_dir or os.path.join(args.root, BINARY_CATALOG_DIR))
+    for character, source_size, size in results:
+        print(f"{character}: {source_size} -> {size} bytes")
+    total_source = sum(result[1] for result in results)
+    total = sum(result[2] for result in results)
+    print(f"Compiled {len(results)} catalogs: {total_source} -> {total} bytes")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+import hashlib
+import json
+import sys
+from array import array
+
+PALETTE_KEYS = ("paletteSwap", "paletteSwapPA")
+METADATA_KEYS = ("info", "team", "base", "display_name")
+# The list label is never written to Misc.as, so it takes no part in duplicate detection.
+FINGERPRINT_IGNORED_KEYS = frozenset(("display_name",))
+
+def pack_color(value):
+    """A palette entry (int, or "0x"/"#" hex string) as an unsigned 32-bit ARGB value."""
+    if isinstance(value, bool):
+        raise ValueError(f"Invalid color: {value!r}")
+    if isinstance(value, int):
+        return value & 0xFFFFFFFF
+    if isinstance(value, str):
+        digits = value.strip().replace("#", "").replace("0x", "").replace("0X", "")
+        if len(digits) not in (6, 8) or not all(c in "0123456789ABCDEFabcdef" for c in digits):
+            raise ValueError(f"Invalid color: {value!r}")
+        if len(digits) == 6:
+            return (int(digits, 16) << 8) | 0xFF
+        return int(digits, 16)
+    raise ValueError(f"Invalid color: {value!r}")
+
+def written_color(value):
+    """A palette entry as Misc.as stores it: uint32 ARGB, with every fully transparent colour as 0."""
+    color = pack_color(value)
+    return 0 if not color & 0xFF000000 else color
+
+def written_palettes(palette_swap, palette_swap_pa):
+    """Both palettes of a costume as update_costumes writes them.
+
+    Every entry goes through written_color, and a paletteSwapPA replacement
+    becomes transparent when paletteSwap maps the same source colour to
+    transparent. Returns ``(swap, swap_pa, preserved)``: two
+    ``(colors, replacements)`` pairs of int lists, and the paletteSwapPA
+    indices that were made transparent.
+    """
+    swap_colors = [written_color(value) for value in palette_swap["colors"]]
+    swap_replacements = [written_color(value) for value in palette_swap["replacements"]]
+    pa_colors = [written_color(value) for value in palette_swap_pa["colors"]]
+    pa_replacements = [written_color(value) for value in palette_swap_pa["replacements"]]
+    swap_map = dict(zip(swap_colors, swap_replacements))
+    preserved = []
+    for i, (color, replacement) in enumerate(zip(pa_colors, pa_replacements)):
+        if replacement != 0 and swap_map.get(color, 1) == 0:
+            pa_replacements[i] = 0
+            preserved.append(i)
+    return (swap_colors, swap_replacements), (pa_colors, pa_replacements), preserved
+
+class PaletteInterner:
+    """Shares identical ``colors`` arrays and key layouts between costumes.
+
+    All costumes of a character map the same source colours, so one
+    interner per character keeps a single copy of each ``colors`` array.
+    """
+    def __init__(self):
+        self._arrays = {}
+        self._layouts = {}
+
+    def colors(self, values):
+        packed = array("I", map(pack_color, values))
+        return self._arrays.setdefault(packed.tobytes(), packed)
+
+    def layout(self, keys):
+        keys = tuple(keys)
+        return self._layouts.setdefault(keys, keys)
+
+class Palette:
+    __slots__ = ("colors", "replacements")
+
+    def __init__(self, colors, replacements):
+        self.colors = colors
+        self.replacements = replacements
+
+    def __eq__(self, other):
+        if not isinstance(other, Palette):
+            return NotImplemented
+        return self.colors == other.colors and self.replacements == other.replacements
+
+    def __hash__(self):
+        return hash((self.colors.tobytes(), self.replacements.tobytes()))
+
+    def to_dict(self, color=int):
+        return {"colors": [color(value) for value in self.colors],
+                "replacements": [color(value) for value in self.replacements]}
+
+class Costume:
+    """Compact costume record: metadata in slots, palettes as packed uint32 arrays.
+
+    ``keys`` keeps the top-level key order of the source so to_dict()
+    round-trips the layout update_costumes writes back; keys other than
+    the metadata and palettes go to ``extra``. Costumes are treated as
+    immutable once built, which lets the hash be cached.
+    """
+    __slots__ = ("keys", "info", "team", "base", "display_name", "palette_swap", "palette_swap_pa", "extra", "_hash", "_fingerprint")
+
+    def __init__(self, keys, palette_swap, palette_swap_pa, info=None, team=None, base=None, display_name=None, extra=None):
+        self.keys = keys
+        self.palette_swap = palette_swap
+        self.palette_swap_pa = palette_swap_pa
+        self.info = info
+        self.team = team
+        self.base = base
+        self.display_name = display_name
+        self.extra = extra
+        self._hash = None
+        self._fingerprint = None
+
+    @classmethod
+    def from_dict(cls, costume, interner=None):
+        """Build from a costume dict; raises ValueError if a palette is missing or malformed."""
+        if isinstance(costume, Costume):
+            return costume
+        interner = interner or PaletteInterner()
+        palettes = []
+        for key in PALETTE_KEYS:
+            palette = costume.get(key)
+            if not isinstance(palette, dict) or not isinstance(palette.get("colors"), list) or not isinstance(palette.get("replacements"), list):
+                raise ValueError(f"Costume {key} must have 'colors' and 'replacements' lists")
+            palettes.append(Palette(interner.colors(palette["colors"]),
+                                    array("I", map(pack_color, palette["replacements"]))))
+        extra = {key: value for key, value in costume.items() if key not in PALETTE_KEYS and key not in METADATA_KEYS}
+        return cls(interner.layout(costume.keys()), palettes[0], palettes[1],
+                   info=costume.get("info"), team=costume.get("team"), base=costume.get("base"),
+                   display_name=costume.get("display_name"), extra=extra or None)
+
+    def get(self, key, default=None):
+        if key == "paletteSwap":
+            return self.palette_swap.to_dict()
+        if key == "paletteSwapPA":
+            return self.palette_swap_pa.to_dict()
+        if key not in self.keys:
+            return default
+        if key in METADATA_KEYS:
+            return getattr(self, key)
+        return self.extra[key]
+
+    def __contains__(self, key):
+        return key in self.keys
+
+    def to_dict(self, color=int):
+        """Plain costume dict in the source key order; ``color`` formats each palette entry."""
+        return {key: self.palette_swap.to_dict(color) if key == "paletteSwap"
+                else self.palette_swap_pa.to_dict(color) if key == "paletteSwapPA"
+                else self.get(key) for key in self.keys}
+
+    def content_key(self):
+        """Hashable key of everything written to Misc.as, i.e. all but ``display_name``."""
+        extra = tuple(sorted(self.extra.items(), key=lambda item: item[0])) if self.extra else ()
+        return (tuple(sorted(key for key in self.keys if key != "display_name")), self.info, self.team, self.base,
+                repr(extra), self.palette_swap.colors.tobytes(), self.palette_swap.replacements.tobytes(),
+                self.palette_swap_pa.colors.tobytes(), self.palette_swap_pa.replacements.tobytes())
+
+    def _update_palettes(self, digest):
+        for values in (self.palette_swap.colors, self.palette_swap.replacements,
+                       self.palette_swap_pa.colors, self.palette_swap_pa.replacements):
+            if sys.byteorder != "little":
+                values = array("I", values)
+                values.byteswap()
+            digest.update(len(values).to_bytes(4, "little"))
+            digest.update(values.tobytes())
+        return digest
+
+    def palette_digest(self):
+        """SHA-256 hex digest of the four palette arrays as little-endian uint32s."""
+        return self._update_palettes(hashlib.sha256()).hexdigest()
+
+    def fingerprint(self):
+        """Canonical identity for duplicate detection, as 16 bytes.
+
+        Covers the palettes as update_costumes writes them (written_palettes,
+        so -1, 4294967295 and "0xFFFFFFFF" agree, as do a catalog costume
+        and its copy read back from Misc.as) and every key except
+        ``display_name``, independent of key order.
+        """
+        if self._fingerprint is None:
+            relevant = {key: _canonical(self.get(key)) for key in self.keys
+                        if key not in FINGERPRINT_IGNORED_KEYS and key not in PALETTE_KEYS}
+            swap, swap_pa, _ = written_palettes(self.palette_swap.to_dict(), self.palette_swap_pa.to_dict())
+            digest = hashlib.blake2b(digest_size=16)
+            for values in swap + swap_pa:
+                values = array("I", values)
+                if sys.byteorder != "little":
+                    values.byteswap()
+                digest.update(len(values).to_bytes(4, "little"))
+                digest.update(values.tobytes())
+            digest.update(json.dumps(relevant, sort_keys=True, separators=(",", ":")).encode("utf-8"))
+            self._fingerprint = digest.digest()
+        return self._fingerprint
+
+    def __eq__(self, other):
+        if not isinstance(other, Costume):
+            return NotImplemented
+        if self is other:
+            return True
+        return (self.palette_swap == other.palette_swap and self.palette_swap_pa == other.palette_swap_pa
+                and self.display_name == other.display_name and self.content_key() == other.content_key())
+
+    def __hash__(self):
+        if self._hash is None:
+            self._hash = hash((self.content_key(), self.display_name))
+        return self._hash
+
+    def __repr__(self):
+        return f"Costume({self.display_name or self.info!r}, {len(self.palette_swap.colors)} colors)"
+
+def _canonical(value):
+    """A non-palette value with integral floats as ints, since Misc.as may write 1.0 as 1."""
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, (list, tuple)):
+        return [_canonical(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _canonical(item) for key, item in value.items()}
+    return value
+
+def costume_fingerprint(costume, interner=None):
+    """Costume.fingerprint() of a costume dict or Costume; None if its palettes are malformed.
+
+    Objects that cache their own fingerprint (Costume, LazyCostume) are asked directly.
+    """
+    if hasattr(costume, "fingerprint"):
+        return costume.fingerprint()
+    try:
+        return Costume.from_dict(costume, interner).fingerprint()
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+def unique_costumes(costumes, seen, interner=None):
+    """The costumes whose fingerprint is not in ``seen``, in order, adding theirs to ``seen``.
+
+    Repeats within ``costumes`` are dropped too; costumes that cannot be
+    fingerprinted are always kept.
+    """
+    unique = []
+    for costume in costumes:
+        fingerprint = costume_fingerprint(costume, interner)
+        if fingerprint is not None:
+            if fingerprint in seen:
+                continue
+            seen.add(fingerprint)
+        unique.append(costume)
+    return unique
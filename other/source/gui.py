@@ -24,13 +24,16 @@ import re
 from tkinter import filedialog
 from PIL import Image, ImageTk
 from utils import (
-    decompress_ssf, extract_misc_as, modify_misc_as, inject_misc_as, compress_swf,
-    extract_character_names, extract_costumes, update_costumes, load_costumes_from_file,
-    check_url_exists, load_costumes_from_url, launch_ssf2, copy_ssf2_directory,
-    color_to_int, int_to_color_str, resource_path, logger, setup_logging
+    modify_misc_as, SSFSession,
+    extract_character_names, extract_costumes, page_costumes, character_fingerprints, update_costumes_batch, merge_new_costumes, iter_costumes_from_file,
+    check_url_exists, load_costumes_from_url, iter_costumes_from_url, launch_ssf2, copy_ssf2_directory,
+    color_to_int, int_to_color_str, resource_path, logger, setup_logging, SCRIPT_ENGINES, CATALOG_EXTENSION,
+    MiscAsCache, SSF_COMPRESSION_LEVELS, CatalogCache, CATALOG_BASE_URL, fetch_catalog_manifest, load_catalog_costumes
 )
 import platform
 from add_costume_window import AddCostumeWindow
+from jpexs import JPEXSWorker, JVMProfile
+from costume import Costume, PaletteInterner, costume_fingerprint, unique_costumes
 
 
 
@@ -118,6 +121,9 @@ class SSF2ModGUI(tk.Tk):
         config_dir = appdirs.user_data_dir(app_name, app_author)
         os.makedirs(config_dir, exist_ok=True)
         self.config_file = os.path.join(config_dir, "config.json")
+        self.misc_cache = MiscAsCache(os.path.join(config_dir, "misc_cache"))
+        self.catalog_cache = CatalogCache(os.path.join(config_dir, "catalog_cache"))
+        self._catalog_manifest = None
         logger.info(f"Target config file path: {redact_path(self.config_file)}")
 
         if os.path.exists(old_config_path):
@@ -181,13 +187,17 @@ class SSF2ModGUI(tk.Tk):
         self.add_new_button = tk.Button(self, text="Add New", command=self.add_costume)
         self.ffdec_jar = None
         self.original_ssf = None
-        self.temp_swf = None
+        self.ssf_session = None
+        self.misc_as_native = False
+        self.jpexs_worker = None
+        self.misc_as_ssf = None
         self.log_visible = True
         self.costume_list_visible = False
         self.ui_initialized = False
         self.setup_frame = None
         self.was_log_visible = False
         self.costume_offset = 0
+        self.costume_cursor = None
         self.total_costumes = 0
         self.costume_count_label = None
         self.preview_photo = None
@@ -263,6 +273,8 @@ class SSF2ModGUI(tk.Tk):
         self.bg_transparency = tk.DoubleVar()
         self.theme_transparency = tk.BooleanVar()
         self.current_theme = tk.StringVar()
+        self.script_engine = tk.StringVar(value="native")
+        self.save_compression = tk.StringVar(value="balanced")
         self.bg_image_path = tk.StringVar()
 
         # Load config after initializing variables
@@ -315,7 +327,6 @@ class SSF2ModGUI(tk.Tk):
             self.ui_initialized = True
             if self.validate_paths() and self.ssf_path.get() and self.ffdec_path.get():
                 logger.info("Paths validated successfully, loading characters from SSF file...")
-                self.temp_swf = os.path.abspath("temp.swf")
                 self.load_characters()
             else:
                 logger.warning("Invalid or missing paths, skipping character loading")
@@ -339,6 +350,8 @@ class SSF2ModGUI(tk.Tk):
         logger.info("Closing application...")
         # Restore stdout before destroying
         sys.stdout = self.original_stdout
+        if self.jpexs_worker is not None:
+            self.jpexs_worker.close()
         if os.path.exists(self.image_cache_dir):
             try:
                 shutil.rmtree(self.image_cache_dir)
@@ -391,7 +404,9 @@ class SSF2ModGUI(tk.Tk):
             "theme": "Dark",
             "bg_image_path": self.default_bg_image,
             "bg_transparency": 70.0,
-            "theme_transparency": False
+            "theme_transparency": False,
+            "script_engine": "native",
+            "save_compression": "balanced"
         }
         self.config = default_config.copy()
 
@@ -432,6 +447,16 @@ class SSF2ModGUI(tk.Tk):
             theme_transparency_value = bool(theme_transparency_value)
         self.theme_transparency.set(theme_transparency_value)
         self.bg_image_path.set(self.config.get("bg_image_path", self.default_bg_image))
+        script_engine = self.config.get("script_engine", "native")
+        if script_engine not in SCRIPT_ENGINES:
+            logger.warning(f"Invalid script engine '{script_engine}' in config, falling back to 'native'")
+            script_engine = "native"
+        self.script_engine.set(script_engine)
+        save_compression = self.config.get("save_compression", "balanced")
+        if save_compression not in SSF_COMPRESSION_LEVELS:
+            logger.warning(f"Invalid save compression '{save_compression}' in config, falling back to 'balanced'")
+            save_compression = "balanced"
+        self.save_compression.set(save_compression)
 
     def save_config(self):
         logger.info("Saving config...")
@@ -446,7 +471,9 @@ class SSF2ModGUI(tk.Tk):
             "theme": self.current_theme.get(),
             "bg_image_path": self.bg_image_path.get(),
             "bg_transparency": self.bg_transparency.get(),
-            "theme_transparency": self.theme_transparency.get()
+            "theme_transparency": self.theme_transparency.get(),
+            "script_engine": self.script_engine.get(),
+            "save_compression": self.save_compression.get()
         })
         logger.info(f"Attempting to save config to: {redact_path(config_path)}")
         try:
@@ -806,16 +833,11 @@ class SSF2ModGUI(tk.Tk):
         if not file_path:
             return
         try:
-            costumes_copy = json.loads(json.dumps(costumes))
-            for costume in costumes_copy:
-                for key in ["paletteSwap", "paletteSwapPA"]:
-                    if key in costume:
-                        for subkey in ["colors", "replacements"]:
-                            if subkey in costume[key]:
-                                costume[key][subkey] = [
-                                    int_to_color_str(color_to_int(color))
-                                    for color in costume[key][subkey]
-                                ]
+            interner = PaletteInterner()
+            costumes_copy = [
+                Costume.from_dict(costume, interner).to_dict(lambda color: int_to_color_str(color_to_int(color)))
+                for costume in costumes
+            ]
             json_str = json.dumps(costumes_copy, indent=2)
             with open(file_path, "w", encoding="utf-8") as f:
                 f.write(json_str)
@@ -1153,6 +1175,27 @@ class SSF2ModGUI(tk.Tk):
         tk.Button(frame_ssf2, text="Open Folder", command=lambda: self.open_folder(os.path.dirname(self.ssf2_exe_path.get())), fg=theme.get("button_fg", "black"), bg=theme.get("button_bg", "#f0f0f0")).pack(side=tk.RIGHT, padx=5)
         self.register_tooltip(ssf2_entry, "Path to SSF2 executable (SSF2.exe).")
 
+        tk.Label(settings_window, text="Script Engine:", fg=theme.get("fg", "black"), bg=theme.get("bg", "#d9d9d9")).pack(pady=5)
+        engine_menu = tk.OptionMenu(settings_window, self.script_engine, *SCRIPT_ENGINES)
+        engine_menu.config(fg=theme.get("fg", "black"), bg=theme.get("button_bg", "#f0f0f0"), activeforeground=theme.get("fg", "black"), activebackground=theme.get("button_bg", "#f0f0f0"))
+        engine_menu["menu"].config(fg=theme.get("fg", "black"), bg=theme.get("bg", "#d9d9d9"))
+        engine_menu.pack()
+        self.register_tooltip(engine_menu, "native: read and patch the costume table in the SWF bytecode directly, using JPEXS only when that fails.\njpexs: always decompile and recompile Misc.as with JPEXS Decompiler.")
+
+        tk.Label(settings_window, text="Save Compression:", fg=theme.get("fg", "black"), bg=theme.get("bg", "#d9d9d9")).pack(pady=5)
+        compression_menu = tk.OptionMenu(settings_window, self.save_compression, *SSF_COMPRESSION_LEVELS)
+        compression_menu.config(fg=theme.get("fg", "black"), bg=theme.get("button_bg", "#f0f0f0"), activeforeground=theme.get("fg", "black"), activebackground=theme.get("button_bg", "#f0f0f0"))
+        compression_menu["menu"].config(fg=theme.get("fg", "black"), bg=theme.get("bg", "#d9d9d9"))
+        compression_menu.pack()
+        self.register_tooltip(compression_menu, "fast: quickest saves while iterating on costumes.\nsmallest: smallest SSF file, for sharing.\nbalanced: zlib's default.")
+
+        jvm_status = "JPEXS startup cache: not available (set ffdec.jar first)"
+        if os.path.isfile(self.ffdec_path.get()):
+            jvm_status = f"JPEXS startup cache: {self.get_jvm_profile(self.ffdec_path.get()).describe()}"
+        jvm_label = tk.Label(settings_window, text=jvm_status, fg=theme.get("fg", "black"), bg=theme.get("bg", "#d9d9d9"))
+        jvm_label.pack(pady=5)
+        self.register_tooltip(jvm_label, "The class data sharing archive is built the first time JPEXS runs and makes later JPEXS launches start faster.")
+
         tk.Button(settings_window, text="Restart Setup", command=self.restart_setup, fg=theme.get("button_fg", "black"), bg=theme.get("button_bg", "#f0f0f0")).pack(pady=10)
         tk.Button(settings_window, text="Start Fresh", command=self.load_characters, fg=theme.get("button_fg", "black"), bg=theme.get("button_bg", "#f0f0f0")).pack(pady=10)
         tk.Button(settings_window, text="Download All Costumes from Github", command=self.download_all_costumes, fg=theme.get("button_fg", "black"), bg=theme.get("button_bg", "#f0f0f0")).pack(pady=10)
@@ -1486,6 +1529,9 @@ class SSF2ModGUI(tk.Tk):
                 if java_found:
                     break
         
+        if java_found:
+            logger.info(f"JPEXS launch profile: {self.get_jvm_profile(ffdec).describe()}")
+
         if not java_found:
             logger.error("Java is not installed or not in PATH")
             # Create custom dialog
@@ -1608,17 +1654,11 @@ class SSF2ModGUI(tk.Tk):
             logger.info(f"Restored backup SSF from {backup_ssf} to {self.ssf_path.get()}")
             self.set_busy("Restoring original SSF file", progress=25)
 
-            self.temp_swf = os.path.abspath("temp.swf")
             original_as = os.path.abspath(os.path.join("scripts", "Misc.as"))
-            if os.path.exists(self.temp_swf):
-                os.remove(self.temp_swf)
 
-            logger.info(f"Decompressing SSF file {self.ssf_path.get()} to SWF...")
-            decompress_ssf(self.ssf_path.get(), self.temp_swf)
             self.set_busy("Restoring original SSF file", progress=50)
 
-            logger.info(f"Extracting Misc.as from SWF using JPEXS Decompiler at {self.ffdec_jar}...")
-            extract_misc_as(self.temp_swf, original_as, self.java_path, self.ffdec_jar)
+            self.load_misc_as(original_as, ssf_path=self.ssf_path.get())
             self.loaded_misc_as = original_as
             self.set_busy("Restoring original SSF file", progress=75)
 
@@ -1682,8 +1722,9 @@ class SSF2ModGUI(tk.Tk):
         int_val = int_val & 0xFFFFFFFF
         return f"0x{int_val:08X}"  # Include "0x" for consistency
 
-    def load_costume_list_for_character(self, character, offset=0, limit=50):
-        logger.info(f"Refreshing costume list for character '{character}' (offset: {offset}, limit: {limit})...")
+    def load_costume_list_for_character(self, character, cursor=None, limit=50):
+        """Reload the costume list from its first page, or append the page at ``cursor``."""
+        logger.info(f"Refreshing costume list for character '{character}' (from: {cursor.position if cursor else 0}, limit: {limit})...")
         if not self.characters_loaded:
             logger.error("Error: Please load characters first.")
             self.clear_busy()
@@ -1700,17 +1741,18 @@ class SSF2ModGUI(tk.Tk):
 
         try:
             logger.info(f"Extracting costumes for character '{character}' from updated Misc.as...")
-            costumes_data = extract_costumes(self.loaded_misc_as, character)
-            self.total_costumes = len(costumes_data)
+            offset = cursor.position if cursor else 0
+            costumes_data, self.costume_cursor, self.total_costumes = page_costumes(self.loaded_misc_as, character, cursor, limit)
             self.set_busy("Refreshing costume list", progress=50)
 
-            # Store original costumes for comparison
-            self.original_costumes = costumes_data.copy()  # Deep copy to preserve original data
-
-            costumes_data = costumes_data[offset:offset + limit]
+            if cursor is None:
+                self.all_costumes = []
+                self.protected_count = 0
+                # Store original costumes for comparison
+                self.original_costumes = []
+            self.original_costumes += costumes_data
             self.costume_offset = offset + len(costumes_data)
 
-            self.all_costumes = []
             protected_costumes = []
             editable_costumes = []
             for idx, costume in enumerate(costumes_data):
@@ -1719,8 +1761,10 @@ class SSF2ModGUI(tk.Tk):
                 else:
                     editable_costumes.append((idx + offset, costume))
 
-            self.all_costumes = [(idx, costume) for idx, costume in protected_costumes + editable_costumes]
-            self.protected_count = len(protected_costumes)
+            # New protected costumes join the protected block at the top; edits to loaded ones are kept
+            self.all_costumes = (self.all_costumes[:self.protected_count] + protected_costumes +
+                                 self.all_costumes[self.protected_count:] + editable_costumes)
+            self.protected_count += len(protected_costumes)
             self.costume_listbox.delete(0, tk.END)
             for idx, costume in self.all_costumes:
                 display_name = self.get_display_name(costume)
@@ -1770,26 +1814,20 @@ class SSF2ModGUI(tk.Tk):
             self.ffdec_jar = os.path.abspath(self.ffdec_path.get())
             self.original_ssf = self.ssf_path.get()
             self.ssf_source = backup_ssf
-            self.temp_swf = os.path.abspath("temp.swf")
             original_as = os.path.abspath(os.path.join("scripts", "Misc.as"))
 
-            if os.path.exists(self.temp_swf):
-                os.remove(self.temp_swf)
-            logger.info(f"Decompressing backup SSF file {self.ssf_source} to SWF...")
-            decompress_ssf(self.ssf_source, self.temp_swf)
             self.set_busy("Downloading all costumes from Github", progress=10)
 
-            logger.info(f"Extracting Misc.as from SWF using JPEXS Decompiler at {self.ffdec_jar}...")
-            if not messagebox.askyesno("Confirm", "This operation will use JPEXS Decompiler to extract scripts. Continue?"):
+            if not self.load_misc_as(original_as, confirm_jpexs=lambda: messagebox.askyesno("Confirm", "This operation will use JPEXS Decompiler to extract scripts. Continue?"), ssf_path=self.ssf_source):
                 logger.info("User cancelled JPEXS Decompiler operation.")
                 self.clear_busy()
                 return
-            extract_misc_as(self.temp_swf, original_as, self.java_path, self.ffdec_jar)
             self.loaded_misc_as = original_as
             self.set_busy("Downloading all costumes from Github", progress=20)
 
             characters = [char for char in self.characters if char != "Custom"]
             updated_characters = []
+            updates = []
             total_characters = len(characters)
             if total_characters == 0:
                 logger.info("No characters available to process.")
@@ -1802,28 +1840,31 @@ class SSF2ModGUI(tk.Tk):
 
             for i, character in enumerate(characters):
                 self.set_busy(f"Processing costumes for {character}", progress=int(current_progress))
-                online_url = f"https://raw.githubusercontent.com/masterwebx/Color-Vault/refs/heads/master/{character}.as"
-                logger.info(f"Checking costumes for character '{character}' at {online_url}")
-                if not check_url_exists(online_url):
-                    logger.info(f"No costumes available for character '{character}' at {online_url}")
-                    current_progress += progress_per_character
-                    continue
-
-                new_costumes = load_costumes_from_url(online_url)
+                manifest = self.get_catalog_manifest()
+                if manifest is not None:
+                    # Unchanged catalogs come from the local cache instead of being downloaded again
+                    new_costumes = load_catalog_costumes(manifest, character, self.catalog_cache)
+                else:
+                    online_url = self.find_online_catalog(character)
+                    if online_url is None:
+                        logger.info(f"No costumes available for character '{character}' online")
+                        current_progress += progress_per_character
+                        continue
+                    new_costumes = load_costumes_from_url(online_url)
                 if not new_costumes:
-                    logger.info(f"No valid costumes loaded for character '{character}' from {online_url}")
+                    logger.info(f"No valid costumes loaded for character '{character}' from the online catalog")
                     current_progress += progress_per_character
                     continue
 
-                existing_costumes = extract_costumes(self.loaded_misc_as, character)
-                combined_costumes = existing_costumes + new_costumes
-                if len(combined_costumes) == len(existing_costumes):
+                # Only costumes not already in the game are appended, so repeated syncs change nothing
+                combined_costumes, new_costumes = merge_new_costumes(extract_costumes(self.loaded_misc_as, character), new_costumes)
+                if not new_costumes:
                     logger.info(f"No new costumes to add for character '{character}'")
                     current_progress += progress_per_character
                     continue
 
                 logger.info(f"Appending {len(new_costumes)} costumes for character '{character}' to existing list...")
-                update_costumes(self.loaded_misc_as, self.loaded_misc_as, character, combined_costumes)
+                updates.append((character, combined_costumes))
                 updated_characters.append(character)
                 logger.info(f"Successfully appended {len(new_costumes)} costumes for character '{character}'")
                 current_progress += progress_per_character
@@ -1834,31 +1875,183 @@ class SSF2ModGUI(tk.Tk):
                 self.clear_busy()
                 return
 
-            logger.info(f"Injecting modified Misc.as into SWF using JPEXS Decompiler...")
-            modified_swf = os.path.abspath("modified.swf")
-            if not messagebox.askyesno("Confirm", "This operation will use JPEXS Decompiler to inject scripts. Continue?"):
+            if not self.write_costume_changes(updates, confirm_jpexs=lambda: messagebox.askyesno("Confirm", "This operation will use JPEXS Decompiler to inject scripts. Continue?")):
                 logger.info("User cancelled JPEXS Decompiler operation.")
                 self.clear_busy()
                 return
-            inject_misc_as(self.temp_swf, self.loaded_misc_as, modified_swf, self.java_path, self.ffdec_jar)
             self.set_busy("Injecting modified scripts", progress=90)
 
             logger.info(f"Compressing modified SWF back to SSF file {self.original_ssf}...")
-            compress_swf(modified_swf, self.original_ssf)
+            self.ssf_session.save(self.original_ssf, SSF_COMPRESSION_LEVELS[self.save_compression.get()])
+            self.misc_as_ssf = self.original_ssf
             self.set_busy("Compressing SSF file", progress=100)
 
             messagebox.showinfo("Success", f"Successfully appended costumes for {', '.join(updated_characters)} from Github.")
 
-            self.cleanup_temp_files([modified_swf])
             self.load_characters()
         except Exception as e:
             logger.error(f"Error downloading costumes: {str(e)}")
             self.show_error("Error", f"Failed to download costumes: {str(e)}")
-            self.cleanup_temp_files([modified_swf])
             self.clear_busy()
         finally:
             self.clear_busy()
 
+    def confirm_jpexs_extract(self):
+        """Ask before launching JPEXS to decompile Misc.as, unless suppressed."""
+        if not self.suppress_prompts["jpexs_extract"]:
+            dialog = Toplevel(self)
+            dialog.title("Confirm")
+            dialog.transient(self)
+            dialog.grab_set()
+            self.center_toplevel(dialog, 400, 150)
+            tk.Label(dialog, text="This operation will use JPEXS Decompiler to extract scripts. Continue?").pack(pady=10)
+            result = tk.BooleanVar(value=False)
+            suppress = tk.BooleanVar(value=False)
+            button_frame = tk.Frame(dialog)
+            button_frame.pack(pady=10)
+            tk.Button(button_frame, text="Yes", command=lambda: [result.set(True), dialog.destroy()]).pack(side=tk.LEFT, padx=5)
+            tk.Button(button_frame, text="No", command=lambda: [result.set(False), dialog.destroy()]).pack(side=tk.LEFT, padx=5)
+            tk.Checkbutton(button_frame, text="Do not show again", variable=suppress).pack(side=tk.LEFT, padx=5)
+            self.wait_window(dialog)
+            if suppress.get():
+                self.suppress_prompts["jpexs_extract"] = True
+                self.save_config()
+            return result.get()
+        return True
+
+    def load_misc_as(self, as_path, confirm_jpexs=None, ssf_path=None):
+        """Write Misc.as for ssf_path (default: the current session's SSF) to as_path.
+
+        A copy cached for the same SSF contents is used when available, which
+        skips decompressing the SSF entirely. Otherwise, with the native script
+        engine the costume table is decoded straight from the ABC bytecode;
+        JPEXS is only used when that is disabled or the native reader cannot
+        handle the file. Returns False if confirm_jpexs declined the JPEXS fallback.
+        """
+        ssf_path = ssf_path or self.ssf_session.ssf_path
+        self.misc_as_ssf = ssf_path
+        kinds = ["native", "jpexs"] if self.script_engine.get() == "native" else ["jpexs"]
+        for kind in kinds:
+            try:
+                if self.misc_cache.get(ssf_path, kind, as_path):
+                    self.misc_as_native = kind == "native"
+                    return True
+            except OSError as e:
+                logger.warning(f"Misc.as cache lookup failed: {str(e)}")
+                break
+
+        if self.ssf_session is None or self.ssf_session.ssf_path != ssf_path or self.ssf_session.modified:
+            logger.info(f"Decompressing {ssf_path} into memory...")
+            self.ssf_session = SSFSession(ssf_path)
+        if self.script_engine.get() == "native":
+            try:
+                start_time = time.time()
+                table = self.ssf_session.write_native_misc_as(as_path)
+                self.misc_as_native = True
+                logger.info(f"Decoded {len(table.characters)} characters from ABC bytecode in {time.time() - start_time:.2f} seconds")
+                self.cache_misc_as(as_path)
+                return True
+            except Exception as e:
+                logger.warning(f"Native costume reader failed ({str(e)}), falling back to JPEXS Decompiler")
+        if confirm_jpexs is not None and not confirm_jpexs():
+            return False
+        logger.info(f"Extracting Misc.as from the in-memory SWF using JPEXS Decompiler...")
+        self.ssf_session.extract_misc_as(as_path, self.java_path, self.ffdec_jar, self.get_jpexs_worker())
+        self.misc_as_native = False
+        self.cache_misc_as(as_path)
+        return True
+
+    def cache_misc_as(self, as_path):
+        """Store a freshly extracted Misc.as under the hash of the session's SSF."""
+        if self.ssf_session.modified:
+            return
+        try:
+            self.misc_cache.put(self.ssf_session.ssf_path, "native" if self.misc_as_native else "jpexs", as_path)
+        except OSError as e:
+            logger.warning(f"Could not cache Misc.as: {str(e)}")
+
+    def get_ssf_session(self):
+        """The in-memory session for the SSF that loaded_misc_as came from.
+
+        It is only decompressed here when a cached Misc.as let loading skip it.
+        """
+        if self.ssf_session is None or self.ssf_session.ssf_path != self.misc_as_ssf:
+            logger.info(f"Decompressing {self.misc_as_ssf} into memory...")
+            self.ssf_session = SSFSession(self.misc_as_ssf)
+        return self.ssf_session
+
+    def get_jpexs_worker(self):
+        """The session's persistent JPEXS worker, started on first use."""
+        ffdec_jar = os.path.abspath(self.ffdec_jar)
+        if self.jpexs_worker is not None and self.jpexs_worker.ffdec_jar != ffdec_jar:
+            self.jpexs_worker.close()
+            self.jpexs_worker = None
+        if self.jpexs_worker is None:
+            self.jpexs_worker = JPEXSWorker(self.java_path, ffdec_jar, self.get_jvm_profile())
+        if self.ssf_session is not None and self.ssf_session.swf is not None:
+            self.jpexs_worker.profile.swf_size = len(self.ssf_session.swf)
+        return self.jpexs_worker
+
+    def get_jvm_profile(self, ffdec_jar=None):
+        """JVM launch profile for ffdec.jar (default: the configured one), with its CDS archive kept next to the config."""
+        ffdec_jar = os.path.abspath(ffdec_jar or self.ffdec_jar or self.ffdec_path.get())
+        cache_dir = os.path.join(os.path.dirname(self.config_file), "jvm")
+        return JVMProfile(self.java_path or "java", ffdec_jar, cache_dir)
+
+    def ensure_jpexs_misc_as(self):
+        """Replace a natively rendered Misc.as with the JPEXS export before it is injected."""
+        if not self.misc_as_native:
+            return
+        logger.info("Extracting full Misc.as with JPEXS Decompiler for injection...")
+        self.get_ssf_session().extract_misc_as(self.loaded_misc_as, self.java_path, self.ffdec_jar, self.get_jpexs_worker())
+        self.misc_as_native = False
+        self.cache_misc_as(self.loaded_misc_as)
+
+    def confirm_jpexs_inject(self):
+        """Ask before launching JPEXS to recompile Misc.as, unless suppressed."""
+        if not self.suppress_prompts["jpexs_inject"]:
+            dialog = Toplevel(self)
+            dialog.title("Confirm")
+            dialog.transient(self)
+            dialog.grab_set()
+            self.center_toplevel(dialog, 400, 150)
+            tk.Label(dialog, text="This operation will use JPEXS Decompiler to inject scripts. Continue?").pack(pady=10)
+            result = tk.BooleanVar(value=False)
+            suppress = tk.BooleanVar(value=False)
+            button_frame = tk.Frame(dialog)
+            button_frame.pack(pady=10)
+            tk.Button(button_frame, text="Yes", command=lambda: [result.set(True), dialog.destroy()]).pack(side=tk.LEFT, padx=5)
+            tk.Button(button_frame, text="No", command=lambda: [result.set(False), dialog.destroy()]).pack(side=tk.LEFT, padx=5)
+            tk.Checkbutton(button_frame, text="Do not show again", variable=suppress).pack(side=tk.LEFT, padx=5)
+            self.wait_window(dialog)
+            if suppress.get():
+                self.suppress_prompts["jpexs_inject"] = True
+                self.save_config()
+            return result.get()
+        return True
+
+    def write_costume_changes(self, updates, confirm_jpexs=None):
+        """Apply the (character, costumes) pairs to Misc.as in one batch and inject the result.
+
+        With the native script engine the costume method is patched in the
+        session SWF directly; otherwise, or if patching fails, the full Misc.as
+        is recompiled with JPEXS. Returns False if confirm_jpexs declined JPEXS.
+        """
+        if self.script_engine.get() == "native" and self.misc_as_native:
+            update_costumes_batch(self.loaded_misc_as, self.loaded_misc_as, updates)
+            try:
+                self.get_ssf_session().inject_costume_table(self.loaded_misc_as, [character for character, _ in updates])
+                return True
+            except Exception as e:
+                logger.warning(f"Native ABC patcher failed ({str(e)}), falling back to JPEXS Decompiler")
+        self.ensure_jpexs_misc_as()
+        update_costumes_batch(self.loaded_misc_as, self.loaded_misc_as, updates)
+        if confirm_jpexs is not None and not confirm_jpexs():
+            return False
+        logger.info("Injecting modified Misc.as into SWF using JPEXS Decompiler...")
+        self.get_ssf_session().inject_misc_as(self.loaded_misc_as, self.java_path, self.ffdec_jar, self.get_jpexs_worker())
+        return True
+
     def load_characters(self):
         logger.info("Loading characters from SSF file...")
         self.set_busy("Loading characters", progress=0)
@@ -1875,33 +2068,10 @@ class SSF2ModGUI(tk.Tk):
 
         try:
             self.set_busy("Loading characters", progress=10)
-            logger.info(f"Decompressing {self.original_ssf} to {self.temp_swf}...")
-            decompress_ssf(self.original_ssf, self.temp_swf)
-            self.set_busy("Loading characters", progress=50)
-            if not self.suppress_prompts["jpexs_extract"]:
-                dialog = Toplevel(self)
-                dialog.title("Confirm")
-                dialog.transient(self)
-                dialog.grab_set()
-                self.center_toplevel(dialog, 400, 150)
-                tk.Label(dialog, text="This operation will use JPEXS Decompiler to extract scripts. Continue?").pack(pady=10)
-                result = tk.BooleanVar(value=False)
-                suppress = tk.BooleanVar(value=False)
-                button_frame = tk.Frame(dialog)
-                button_frame.pack(pady=10)
-                tk.Button(button_frame, text="Yes", command=lambda: [result.set(True), dialog.destroy()]).pack(side=tk.LEFT, padx=5)
-                tk.Button(button_frame, text="No", command=lambda: [result.set(False), dialog.destroy()]).pack(side=tk.LEFT, padx=5)
-                tk.Checkbutton(button_frame, text="Do not show again", variable=suppress).pack(side=tk.LEFT, padx=5)
-                self.wait_window(dialog)
-                if suppress.get():
-                    self.suppress_prompts["jpexs_extract"] = True
-                    self.save_config()
-                if not result.get():
-                    logger.info("User cancelled JPEXS Decompiler operation.")
-                    self.clear_busy()
-                    return
-            logger.info(f"Extracting Misc.as from {self.temp_swf}...")
-            extract_misc_as(self.temp_swf, original_as, self.java_path, self.ffdec_jar)
+            if not self.load_misc_as(original_as, confirm_jpexs=self.confirm_jpexs_extract, ssf_path=self.original_ssf):
+                logger.info("User cancelled JPEXS Decompiler operation.")
+                self.clear_busy()
+                return
             self.set_busy("Loading characters", progress=75)
             logger.info(f"Extracting character names from {original_as}...")
             new_characters = extract_character_names(original_as)
@@ -1945,11 +2115,11 @@ class SSF2ModGUI(tk.Tk):
             self.java_path = None
             self.ffdec_jar = None
             self.original_ssf = None
-            self.temp_swf = None
+            self.ssf_session = None
             self.characters_loaded = False
             self.clear_busy()
         finally:
-            self.cleanup_temp_files([self.temp_swf, original_as])
+            self.cleanup_temp_files([original_as])
 
     def cleanup_temp_files(self, files):
         logger.info("Cleaning up temporary files created during operations...")
@@ -2068,21 +2238,54 @@ class SSF2ModGUI(tk.Tk):
 
     def add_from_file(self):
         logger.info("Opening file dialog to load costumes from a file...")
-        file_path = filedialog.askopenfilename(filetypes=[("Text files", "*.txt"), ("ActionScript files", "*.as")])
+        file_path = filedialog.askopenfilename(filetypes=[("Text files", "*.txt"), ("ActionScript files", "*.as"), ("Costume catalogs", "*" + CATALOG_EXTENSION)])
         if not file_path:
             logger.info("No file selected for loading costumes.")
             return
         try:
             logger.info(f"Loading costumes from file: {file_path}")
-            new_costumes = load_costumes_from_file(file_path)
-            self.loaded_costumes.extend(new_costumes)
-            for costume in new_costumes:
-                self.loaded_listbox.insert(tk.END, costume['display_name'])
-            logger.info(f"Successfully loaded {len(new_costumes)} costumes from file.")
+            count = self.stream_into_loaded_list(iter_costumes_from_file(file_path))
+            logger.info(f"Successfully loaded {count} costumes from file.")
         except Exception as e:
             self.show_error("Error", f"Failed to load costumes from file: {str(e)}")
             logger.error(f"Error loading costumes from file: {str(e)}")
 
+    def current_fingerprints(self):
+        """Fingerprints of every costume in the current list, including the pages not loaded yet."""
+        seen = {costume_fingerprint(costume) for _, costume in self.all_costumes}
+        if self.costume_cursor is not None:
+            seen |= character_fingerprints(self.loaded_misc_as, self.costume_cursor.character, self.costume_cursor.position)
+        seen.discard(None)
+        return seen
+
+    def costume_fingerprints(self):
+        """Fingerprints of every costume in the current and loaded lists."""
+        seen = self.current_fingerprints()
+        seen.update(costume_fingerprint(costume) for costume in self.loaded_costumes)
+        seen.discard(None)
+        return seen
+
+    def stream_into_loaded_list(self, costumes, refresh_every=25):
+        """Append costumes to the loaded list as they are read, redrawing every few entries.
+
+        Costumes already in the current or loaded list are skipped.
+        """
+        seen = self.costume_fingerprints()
+        count = 0
+        duplicates = 0
+        for costume in costumes:
+            if not unique_costumes([costume], seen):
+                duplicates += 1
+                continue
+            self.loaded_costumes.append(costume)
+            self.loaded_listbox.insert(tk.END, costume['display_name'])
+            count += 1
+            if count % refresh_every == 0:
+                self.update_idletasks()
+        if duplicates:
+            logger.info(f"Skipped {duplicates} costumes already in the current or loaded list")
+        return count
+
     def add_new_costume_to_list(self, new_costume, source=None, current_idx=None, loaded_idx=None):
         # Handle new costume addition (source is None or not 'current'/'loaded')
         if source not in ['current', 'loaded']:
@@ -2106,15 +2309,49 @@ class SSF2ModGUI(tk.Tk):
         sel = sorted(self.loaded_listbox.curselection(), reverse=True)
         if not sel:
             return
+        seen = self.current_fingerprints()
+        duplicates = 0
+        # sel is in reverse order; move in list order so the kept copy of a repeat is the first one
+        for idx in reversed(sel):
+            costume = self.loaded_costumes[idx]
+            if unique_costumes([costume], seen):
+                self.all_costumes.append((len(self.all_costumes), costume))
+                self.costume_listbox.insert(tk.END, costume['display_name'])
+            else:
+                duplicates += 1
         for idx in sel:
-            costume = self.loaded_costumes.pop(idx)
-            self.all_costumes.append((len(self.all_costumes), costume))
+            self.loaded_costumes.pop(idx)
             self.loaded_listbox.delete(idx)
-            self.costume_listbox.insert(tk.END, costume['display_name'])
+        if duplicates:
+            logger.info(f"Skipped {duplicates} costumes already in the current list")
         if self.loaded_costumes:
             self.loaded_listbox.select_set(min(sel[0], len(self.loaded_costumes) - 1))
 
-    def load_from_online(self):
+    def get_catalog_manifest(self):
+        """The online catalog manifest, fetched once per session; None if it is unavailable."""
+        if self._catalog_manifest is None:
+            self._catalog_manifest = fetch_catalog_manifest() or False
+        return self._catalog_manifest or None
+
+    def find_online_catalog(self, character):
+        """URL of the character's online catalog, or None if there is none.
+
+        With the manifest no request is needed, and the compiled catalog is
+        used when the manifest lists a current one; without it only the
+        source catalog is probed.
+        """
+        manifest = self.get_catalog_manifest()
+        if manifest is not None:
+            name = manifest.binary_name(character) or manifest.catalog_name(character)
+            if name is None:
+                logger.info(f"The catalog manifest lists no costumes for character '{character}'")
+                return None
+            return f"{CATALOG_BASE_URL}/{name}"
+        source_url = f"{CATALOG_BASE_URL}/{character}.as"
+        logger.info(f"Checking costumes for character '{character}' at {source_url}")
+        return source_url if check_url_exists(source_url) else None
+
+    def load_from_online(self, character):
         if not self.suppress_prompts["load_from_online_confirm"]:
             dialog = Toplevel(self)
             dialog.title("Confirm")
@@ -2140,11 +2377,14 @@ class SSF2ModGUI(tk.Tk):
             logger.info("Proceeding with online costume loading as per user preference.")   
 
         try:
-            new_costumes = load_costumes_from_url(self.online_url)
-            self.loaded_costumes.extend(new_costumes)
-            for costume in new_costumes:
-                self.loaded_listbox.insert(tk.END, costume['display_name'])
-            logger.info(f"Successfully loaded {len(new_costumes)} costumes from online repository.")
+            manifest = self.get_catalog_manifest()
+            if manifest is not None and manifest.catalog_name(character) is not None:
+                # Unchanged catalogs come from the local cache instead of being downloaded again
+                costumes = load_catalog_costumes(manifest, character, self.catalog_cache)
+            else:
+                costumes = iter_costumes_from_url(self.online_url)
+            count = self.stream_into_loaded_list(costumes)
+            logger.info(f"Successfully loaded {count} costumes from online repository.")
         except Exception as e:
             self.show_error("Error", f"Failed to load costumes from online: {str(e)}")
             logger.error(f"Error loading costumes from online: {str(e)}")
@@ -2191,45 +2431,18 @@ class SSF2ModGUI(tk.Tk):
             self.show_error("Error", f"Cannot write to SSF file: {self.original_ssf}. Check file permissions.")
             return
         self.set_busy("Saving changes and launching SSF2", progress=0)
-        modified_swf = os.path.abspath("modified.swf")
         try:
             costumes_to_save = [costume for idx, costume in self.all_costumes]
-            logger.info(f"Updating costumes for character '{character}' in Misc.as...")
-            update_costumes(self.loaded_misc_as, self.loaded_misc_as, character, costumes_to_save)
             self.set_busy("Saving changes and launching SSF2", progress=33)
-            if not os.path.exists(self.temp_swf):
-                logger.info(f"Decompressing SSF file {self.ssf_source} to SWF...")
-                decompress_ssf(self.ssf_source, self.temp_swf)
-            self.set_busy("Saving changes and launching SSF2", progress=50)
-            logger.info(f"Injecting modified Misc.as into SWF using JPEXS Decompiler...")
-            if not self.suppress_prompts["jpexs_inject"]:
-                dialog = Toplevel(self)
-                dialog.title("Confirm")
-                dialog.transient(self)
-                dialog.grab_set()
-                self.center_toplevel(dialog, 400, 150)
-                tk.Label(dialog, text="This operation will use JPEXS Decompiler to inject scripts. Continue?").pack(pady=10)
-                result = tk.BooleanVar(value=False)
-                suppress = tk.BooleanVar(value=False)
-                button_frame = tk.Frame(dialog)
-                button_frame.pack(pady=10)
-                tk.Button(button_frame, text="Yes", command=lambda: [result.set(True), dialog.destroy()]).pack(side=tk.LEFT, padx=5)
-                tk.Button(button_frame, text="No", command=lambda: [result.set(False), dialog.destroy()]).pack(side=tk.LEFT, padx=5)
-                tk.Checkbutton(button_frame, text="Do not show again", variable=suppress).pack(side=tk.LEFT, padx=5)
-                self.wait_window(dialog)
-                if suppress.get():
-                    self.suppress_prompts["jpexs_inject"] = True
-                    self.save_config()
-                if not result.get():
-                    logger.info("User cancelled JPEXS Decompiler operation.")
-                    self.clear_busy()
-                    return
-            else:
-                logger.info("Proceeding with JPEXS Decompiler injection as per user preference.")
-            inject_misc_as(self.temp_swf, self.loaded_misc_as, modified_swf, self.java_path, self.ffdec_jar)
+            logger.info(f"Updating costumes for character '{character}' in Misc.as...")
+            if not self.write_costume_changes([(character, costumes_to_save)], confirm_jpexs=self.confirm_jpexs_inject):
+                logger.info("User cancelled JPEXS Decompiler operation.")
+                self.clear_busy()
+                return
             self.set_busy("Saving changes and launching SSF2", progress=75)
             logger.info(f"Compressing modified SWF back to SSF file {self.original_ssf}...")
-            compress_swf(modified_swf, self.original_ssf)
+            self.ssf_session.save(self.original_ssf, SSF_COMPRESSION_LEVELS[self.save_compression.get()])
+            self.misc_as_ssf = self.original_ssf
             self.set_busy("Saving changes and launching SSF2", progress=90)
             logger.info(f"Launching SSF2 executable at {self.ssf2_exe_path.get()}...")
             if not self.suppress_prompts["ssf2_launch"]:
@@ -2265,8 +2478,6 @@ class SSF2ModGUI(tk.Tk):
             logger.error(f"Error saving or launching: {str(e)}")
             self.show_error("Error", f"Failed to save or launch SSF2: {str(e)}")
             self.clear_busy()
-        finally:
-            self.cleanup_temp_files([modified_swf])
 
     def load_costume_list(self):
         logger.info("Loading costume list for the selected character...")
@@ -2291,12 +2502,8 @@ class SSF2ModGUI(tk.Tk):
 
         try:
             logger.info(f"Extracting costumes for character '{character}'...")
-            costumes_data = extract_costumes(self.loaded_misc_as, character)
-            self.total_costumes = len(costumes_data)
-            self.costume_offset = 0
+            costumes_data, self.costume_cursor, self.total_costumes = page_costumes(self.loaded_misc_as, character, limit=50)
             self.set_busy("Loading costume list", progress=50)
-
-            costumes_data = costumes_data[:50]
             self.costume_offset = len(costumes_data)
 
             protected_costumes = []
@@ -2412,21 +2619,24 @@ class SSF2ModGUI(tk.Tk):
 
             pagination_frame = tk.Frame(left_panel)
             pagination_frame.pack(pady=5)
-            if self.costume_offset < self.total_costumes:
+            if self.costume_cursor is not None:
                 tk.Button(pagination_frame, text="Load More (50)", command=lambda: self.load_more_costumes(character)).pack(side=tk.LEFT, padx=5)
                 tk.Button(pagination_frame, text="Load All", command=lambda: self.load_all_costumes(character)).pack(side=tk.LEFT, padx=5)
 
             self.online_button_frame = tk.Frame(left_panel)
             self.online_button_frame.pack(pady=5)
 
-            self.online_url = f"https://raw.githubusercontent.com/masterwebx/Color-Vault/refs/heads/master/{character}.as"
-            if check_url_exists(self.online_url):
-                self.load_online_button = tk.Button(self.online_button_frame, text="Load Costumes from Online", width=25, command=self.load_from_online)
+            self.online_url = self.find_online_catalog(character)
+            if self.online_url is not None:
+                manifest = self.get_catalog_manifest()
+                online_count = manifest.count(character) if manifest is not None else None
+                online_text = f"Load Costumes from Online ({online_count})" if online_count is not None else "Load Costumes from Online"
+                self.load_online_button = tk.Button(self.online_button_frame, text=online_text, width=25, command=lambda: self.load_from_online(character))
                 self.load_online_button.pack(side=tk.LEFT, padx=5)
                 self.register_tooltip(self.load_online_button, "Load costumes from an online repository.")
             else:
                 self.load_online_button = None
-                logger.info(f"No online costumes available for character '{character}' at {self.online_url}")
+                logger.info(f"No online costumes available for character '{character}'")
 
             backup_ssf = self.ssf_source
             if os.path.exists(backup_ssf):
@@ -2916,12 +3126,18 @@ class SSF2ModGUI(tk.Tk):
             self.preview_canvas.config(bg="#808080")
 
     def load_more_costumes(self, character):
+        if self.costume_cursor is None:
+            logger.info(f"All costumes for character '{character}' are already loaded.")
+            return
         logger.info(f"Loading next 50 costumes for character '{character}'...")
-        self.load_costume_list_for_character(character, offset=self.costume_offset, limit=50)
+        self.load_costume_list_for_character(character, cursor=self.costume_cursor, limit=50)
 
     def load_all_costumes(self, character):
+        if self.costume_cursor is None:
+            logger.info(f"All costumes for character '{character}' are already loaded.")
+            return
         logger.info(f"Loading all costumes for character '{character}'...")
-        self.load_costume_list_for_character(character, offset=0, limit=self.total_costumes)
+        self.load_costume_list_for_character(character, cursor=self.costume_cursor, limit=None)
 
     def save_changes(self, character):
         logger.info("Saving costume changes...")
@@ -2931,46 +3147,20 @@ class SSF2ModGUI(tk.Tk):
             return
 
         self.set_busy("Saving changes", progress=0)
-        modified_swf = os.path.abspath("modified.swf")
         try:
             costumes_to_save = [costume for idx, costume in self.all_costumes]
-            logger.info(f"Updating costumes for '{character}'...")
-            update_costumes(self.loaded_misc_as, self.loaded_misc_as, character, costumes_to_save)
             self.set_busy("Saving changes", progress=33)
 
-            if not os.path.exists(self.temp_swf):
-                logger.info(f"Decompressing {self.ssf_source}...")
-                decompress_ssf(self.ssf_source, self.temp_swf)
-            self.set_busy("Saving changes", progress=50)
-
-            logger.info("Injecting modified Misc.as...")
-            if not self.suppress_prompts["jpexs_inject"]:
-                dialog = Toplevel(self)
-                dialog.title("Confirm")
-                dialog.transient(self)
-                dialog.grab_set()
-                self.center_toplevel(dialog, 400, 150)
-                tk.Label(dialog, text="This operation will use JPEXS Decompiler to inject scripts. Continue?").pack(pady=10)
-                result = tk.BooleanVar(value=False)
-                suppress = tk.BooleanVar(value=False)
-                button_frame = tk.Frame(dialog)
-                button_frame.pack(pady=10)
-                tk.Button(button_frame, text="Yes", command=lambda: [result.set(True), dialog.destroy()]).pack(side=tk.LEFT, padx=5)
-                tk.Button(button_frame, text="No", command=lambda: [result.set(False), dialog.destroy()]).pack(side=tk.LEFT, padx=5)
-                tk.Checkbutton(button_frame, text="Do not show again", variable=suppress).pack(side=tk.LEFT, padx=5)
-                self.wait_window(dialog)
-                if suppress.get():
-                    self.suppress_prompts["jpexs_inject"] = True
-                    self.save_config()
-                if not result.get():
-                    logger.info("User cancelled JPEXS Decompiler operation.")
-                    self.clear_busy()
-                    return
-            inject_misc_as(self.temp_swf, self.loaded_misc_as, modified_swf, self.java_path, self.ffdec_jar)
+            logger.info(f"Updating costumes for '{character}'...")
+            if not self.write_costume_changes([(character, costumes_to_save)], confirm_jpexs=self.confirm_jpexs_inject):
+                logger.info("User cancelled JPEXS Decompiler operation.")
+                self.clear_busy()
+                return
             self.set_busy("Saving changes", progress=75)
 
             logger.info(f"Compressing to {self.original_ssf}...")
-            compress_swf(modified_swf, self.original_ssf)
+            self.ssf_session.save(self.original_ssf, SSF_COMPRESSION_LEVELS[self.save_compression.get()])
+            self.misc_as_ssf = self.original_ssf
             self.set_busy("Saving changes", progress=90)
 
             # Update the ssf_source backup to match the modified SSF
@@ -2984,8 +3174,9 @@ class SSF2ModGUI(tk.Tk):
             else:
                 raise Exception("SSF file not found after save")
 
-            # Extract the updated Misc.as to ensure loaded_misc_as is current
-            extract_misc_as(modified_swf, self.loaded_misc_as, self.java_path, self.ffdec_jar)
+            # save() verified the written SSF against the injected SWF, so the
+            # Misc.as just injected is current; cache it for the new SSF contents
+            self.cache_misc_as(self.loaded_misc_as)
             logger.info(f"Refreshed loaded_misc_as: {self.loaded_misc_as}")
 
             messagebox.showinfo("Success", f"Updated costumes for {character}")
@@ -2995,8 +3186,6 @@ class SSF2ModGUI(tk.Tk):
             logger.error(f"Error saving: {str(e)}")
             self.show_error("Error", f"Failed to save: {str(e)}")
             self.clear_busy()
-        finally:
-            self.cleanup_temp_files([modified_swf])
 
     def hide_costume_list(self):
         logger.info("Hiding costume list...")
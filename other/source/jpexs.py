@@ -0,0 +1,253 @@
+import hashlib
+import os
+import re
+import subprocess
+import threading
+import time
+
+from utils import resource_path, logger
+
+WORKER_MARKER = "@@JPEXS-WORKER@@"
+
+class JVMProfile:
+    """Startup-oriented JVM options for running FFDec.
+
+    C2 is disabled (FFDec commands are short-lived), the heap is sized from the
+    SWF being edited, and an AppCDS archive of the classes FFDec loads is
+    written to ``cache_dir`` on first use and mapped on every later launch.
+    The archive is keyed by the ffdec.jar path, size and mtime so an FFDec
+    update gets a fresh one.
+    """
+    MIN_HEAP_MB = 512
+    MAX_HEAP_MB = 4096
+
+    def __init__(self, java_path, ffdec_jar, cache_dir, swf_size=0):
+        self.java_path = java_path
+        self.ffdec_jar = os.path.abspath(ffdec_jar)
+        self.cache_dir = cache_dir
+        self.swf_size = swf_size
+        self._java_version = None
+
+    @property
+    def archive_path(self):
+        stat = os.stat(self.ffdec_jar)
+        key = hashlib.sha1(f"{self.ffdec_jar}|{stat.st_size}|{stat.st_mtime_ns}".encode("utf-8")).hexdigest()[:12]
+        return os.path.join(self.cache_dir, f"ffdec-{key}.jsa")
+
+    def is_warm(self):
+        """True once the class data sharing archive for this ffdec.jar exists."""
+        try:
+            return os.path.getsize(self.archive_path) > 0
+        except OSError:
+            return False
+
+    def java_version(self):
+        """Major Java version (8, 11, 17, ...), or 0 if it cannot be determined."""
+        if self._java_version is None:
+            try:
+                result = subprocess.run([self.java_path, "-version"], capture_output=True, text=True,
+                                        creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0))
+                match = re.search(r'version "(\d+)(?:\.(\d+))?', result.stderr)
+                major = int(match.group(1)) if match else 0
+                self._java_version = int(match.group(2)) if major == 1 and match.group(2) else major
+            except (OSError, ValueError):
+                self._java_version = 0
+        return self._java_version
+
+    def heap_mb(self):
+        # FFDec keeps the parsed SWF plus decompiled trees in memory; budget ~16x the SWF.
+        wanted = self.swf_size * 16 // (1 << 20)
+        return min(self.MAX_HEAP_MB, max(self.MIN_HEAP_MB, wanted))
+
+    def options(self):
+        options = ["-XX:TieredStopAtLevel=1", f"-Xmx{self.heap_mb()}m"]
+        version = self.java_version()
+        if not self.cache_dir or version < 13:
+            return options + ["-Xshare:auto"]
+        os.makedirs(self.cache_dir, exist_ok=True)
+        archive = self.archive_path
+        if version >= 19:
+            return options + ["-XX:+AutoCreateSharedArchive", f"-XX:SharedArchiveFile={archive}", "-Xshare:auto"]
+        if self.is_warm():
+            return options + [f"-XX:SharedArchiveFile={archive}", "-Xshare:auto"]
+        return options + [f"-XX:ArchiveClassesAtExit={archive}"]
+
+    def describe(self):
+        state = "warm" if self.is_warm() else "cold"
+        return f"CDS archive {state}, -Xmx{self.heap_mb()}m, Java {self.java_version() or 'unknown'}"
+
+class JPEXSWorker:
+    """Runs FFDec commands, keeping one long-lived JVM for the whole session.
+
+    The JVM is started lazily on the first command and kept until close().
+    If it cannot start (e.g. Java older than 11, which cannot launch
+    JpexsWorker.java directly) or FFDec exits the JVM after a command, the
+    worker falls back to one ``java -jar ffdec.jar`` process per command.
+    Both paths use the options of ``profile`` when one is given, and log the
+    time from spawning the JVM to its first output byte. The worker ends
+    each command's stderr output with a marker line, and run() waits for it
+    so no output is attributed to the wrong command.
+    """
+    def __init__(self, java_path, ffdec_jar, profile=None):
+        self.java_path = java_path
+        self.ffdec_jar = os.path.abspath(ffdec_jar)
+        self.profile = profile
+        self.available = True
+        self.process = None
+        self.last_startup_seconds = None
+        self._output = []
+        self._lock = threading.Lock()
+        self._stderr_done = threading.Condition(self._lock)
+        self._stderr_marks = 0
+        self._stderr_closed = False
+
+    def _jvm_options(self):
+        return self.profile.options() if self.profile is not None else []
+
+    def _log_startup(self, kind, startup):
+        self.last_startup_seconds = startup
+        profile = f" ({self.profile.describe()})" if self.profile is not None else ""
+        logger.info(f"JPEXS {kind} startup-to-first-byte: {startup:.2f} seconds{profile}")
+
+    def start(self):
+        source = resource_path("JpexsWorker.java")
+        cmd = [self.java_path] + self._jvm_options() + ["-cp", self.ffdec_jar, source]
+        logger.info(f"Starting JPEXS worker: {' '.join(cmd)}")
+        start_time = time.perf_counter()
+        try:
+            self.process = subprocess.Popen(
+                cmd,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                encoding="utf-8",
+                errors="replace",
+                bufsize=1,
+                creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0),
+            )
+        except OSError as e:
+            self.available = False
+            raise RuntimeError(f"JPEXS worker failed to start: {e}")
+        with self._lock:
+            self._output = []
+            self._stderr_marks = 0
+            self._stderr_closed = False
+        threading.Thread(target=self._drain_stderr, args=(self.process,), daemon=True).start()
+        status, message = self._read_status()
+        self._wait_for_stderr(1)
+        if status is None:
+            self.available = False
+            self.process = None
+            raise RuntimeError(f"JPEXS worker failed to start: {''.join(self._take_output()).strip()}")
+        self._log_startup("worker", time.perf_counter() - start_time)
+
+    def _drain_stderr(self, process):
+        for line in process.stderr:
+            with self._lock:
+                if line.rstrip("\r\n") == WORKER_MARKER:
+                    self._stderr_marks += 1
+                    self._stderr_done.notify_all()
+                else:
+                    self._output.append(line)
+        with self._lock:
+            self._stderr_closed = True
+            self._stderr_done.notify_all()
+
+    def _wait_for_stderr(self, marks, timeout=30):
+        """Wait until the worker has ended ``marks`` commands' stderr output, or closed stderr."""
+        with self._lock:
+            if not self._stderr_done.wait_for(lambda: self._stderr_marks >= marks or self._stderr_closed, timeout):
+                logger.warning("JPEXS worker did not finish its error output in time")
+
+    def _take_output(self):
+        with self._lock:
+            output, self._output = self._output, []
+        return output
+
+    def _read_status(self):
+        """Wait for the next status line; returns (None, None) if the JVM exited."""
+        for line in self.process.stdout:
+            if line.startswith(WORKER_MARKER):
+                parts = line[len(WORKER_MARKER):].strip().split(" ", 1)
+                return int(parts[0]), parts[1] if len(parts) > 1 else ""
+        self.process.wait()
+        return None, None
+
+    def run(self, args):
+        """Run one FFDec command line (without ``java -jar ffdec.jar``) and return its output."""
+        if any("\t" in arg or "\n" in arg for arg in args):
+            return self.run_once(args)
+        if self.available and (self.process is None or self.process.poll() is not None):
+            try:
+                self.start()
+            except RuntimeError as e:
+                logger.warning(f"{e}; starting a new JVM per command instead")
+        if not self.available:
+            return self.run_once(args)
+
+        start_time = time.perf_counter()
+        with self._lock:
+            self._output = []
+            marks = self._stderr_marks + 1
+        self.process.stdin.write("\t".join(args) + "\n")
+        self.process.stdin.flush()
+        status, message = self._read_status()
+        self._wait_for_stderr(marks)
+        output = "".join(self._take_output())
+        logger.info(f"JPEXS worker ran {args[0]} in {time.perf_counter() - start_time:.2f} seconds")
+        if status is None:
+            # FFDec called System.exit; the command ran but the JVM cannot be reused.
+            returncode = self.process.returncode
+            self.process = None
+            self.available = False
+            logger.warning("JPEXS worker exited after a command, using one JVM per command from now on")
+            if returncode != 0:
+                raise subprocess.CalledProcessError(returncode, args, "", output)
+            return output
+        if status != 0:
+            raise subprocess.CalledProcessError(status, args, "", output or message)
+        return output
+
+    def run_once(self, args):
+        """Run one FFDec command in a fresh JVM."""
+        cmd = [self.java_path] + self._jvm_options() + ["-jar", self.ffdec_jar] + args
+        logger.info(f"Executing command: {' '.join(cmd)}")
+        start_time = time.perf_counter()
+        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                   creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0))
+        first_byte = []
+        chunks = {"stdout": [], "stderr": []}
+
+        def read(stream, name):
+            for chunk in iter(lambda: stream.read1(4096), b""):
+                if not first_byte:
+                    first_byte.append(time.perf_counter())
+                chunks[name].append(chunk)
+
+        readers = [threading.Thread(target=read, args=(process.stdout, "stdout")),
+                   threading.Thread(target=read, args=(process.stderr, "stderr"))]
+        for reader in readers:
+            reader.start()
+        for reader in readers:
+            reader.join()
+        returncode = process.wait()
+        self._log_startup("process", (first_byte[0] if first_byte else time.perf_counter()) - start_time)
+        logger.info(f"JPEXS process ran {args[0]} in {time.perf_counter() - start_time:.2f} seconds")
+        stdout = b"".join(chunks["stdout"]).decode("utf-8", errors="replace")
+        stderr = b"".join(chunks["stderr"]).decode("utf-8", errors="replace")
+        if returncode != 0:
+            raise subprocess.CalledProcessError(returncode, cmd, stdout, stderr)
+        return stdout
+
+    def close(self):
+        if self.process is None:
+            return
+        logger.info("Stopping JPEXS worker")
+        try:
+            # The JVM writes a cold CDS archive on exit, so give it time to finish.
+            self.process.stdin.close()
+            self.process.wait(timeout=30)
+        except (OSError, subprocess.TimeoutExpired):
+            self.process.kill()
+        self.process = None
@@ -0,0 +1,176 @@
+import lzma
+import struct
+import zlib
+
+from avm2 import ABCFile
+
+TAG_END = 0
+TAG_DO_ABC = 72
+TAG_DO_ABC2 = 82
+
+class SWFTag:
+    """A tag in the SWF tag stream; the body is sliced out of the file lazily."""
+    __slots__ = ("code", "offset", "header_length", "length", "_data")
+
+    def __init__(self, data, code, offset, header_length, length):
+        self._data = data
+        self.code = code
+        self.offset = offset
+        self.header_length = header_length
+        self.length = length
+
+    @property
+    def end(self):
+        return self.offset + self.header_length + self.length
+
+    @property
+    def raw(self):
+        """The whole tag, header included."""
+        return self._data[self.offset:self.end]
+
+    @property
+    def body(self):
+        start = self.offset + self.header_length
+        return self._data[start:start + self.length]
+
+    @property
+    def is_abc(self):
+        return self.code in (TAG_DO_ABC, TAG_DO_ABC2)
+
+    @property
+    def abc_name(self):
+        """Name of a DoABC2 tag, or an empty string for plain DoABC."""
+        if self.code != TAG_DO_ABC2:
+            return ""
+        body = self.body
+        end = bytes(body[4:]).index(b"\x00") + 4
+        return bytes(body[4:end]).decode("utf-8", errors="replace")
+
+    @property
+    def abc_data(self):
+        """The ABC bytecode block carried by a DoABC or DoABC2 tag."""
+        body = self.body
+        if self.code == TAG_DO_ABC:
+            return body
+        if self.code == TAG_DO_ABC2:
+            name_end = bytes(body[4:]).index(b"\x00") + 4
+            return body[name_end + 1:]
+        raise ValueError(f"Tag {self.code} is not a DoABC tag")
+
+    def __repr__(self):
+        return f"SWFTag(code={self.code}, offset={self.offset}, length={self.length})"
+
+class SWFFile:
+    """Walks the tags of an SWF held in memory.
+
+    CWS and ZWS files are inflated once on construction; ``data`` always holds
+    the uncompressed file with an FWS signature, and ``compression`` remembers
+    the original signature so a writer can restore it.
+    """
+    HEADER_SIZE = 8
+
+    def __init__(self, data):
+        data = memoryview(data)
+        signature = bytes(data[:3])
+        if signature not in (b"FWS", b"CWS", b"ZWS"):
+            raise ValueError(f"Not an SWF file (signature {signature!r})")
+        self.compression = signature.decode("ascii")
+        self.version = data[3]
+        self.file_length = struct.unpack_from("<I", data, 4)[0]
+
+        if signature == b"CWS":
+            data = memoryview(b"FWS" + bytes(data[3:8]) + zlib.decompress(data[8:]))
+        elif signature == b"ZWS":
+            # ZWS: u32 compressed length, 5 byte LZMA properties, raw LZMA stream.
+            props = bytes(data[12:17])
+            decompressor = lzma.LZMADecompressor(format=lzma.FORMAT_ALONE)
+            body = decompressor.decompress(props + b"\xff" * 8 + bytes(data[17:]))
+            data = memoryview(b"FWS" + bytes(data[3:8]) + body[:self.file_length - 8])
+        self.data = data
+
+        nbits = data[8] >> 3
+        rect_length = (5 + 4 * nbits + 7) // 8
+        self.frame_rate, self.frame_count = struct.unpack_from("<HH", data, 8 + rect_length)
+        self.header_length = 8 + rect_length + 4
+
+    def tags(self):
+        """Yield every tag up to and including the End tag."""
+        data = self.data
+        pos = self.header_length
+        size = len(data)
+        while pos + 2 <= size:
+            code_and_length = struct.unpack_from("<H", data, pos)[0]
+            code = code_and_length >> 6
+            length = code_and_length & 0x3F
+            header_length = 2
+            if length == 0x3F:
+                length = struct.unpack_from("<I", data, pos + 2)[0]
+                header_length = 6
+            tag = SWFTag(data, code, pos, header_length, length)
+            if tag.end > size:
+                raise ValueError(f"Tag {code} at offset {pos} runs past the end of the SWF")
+            yield tag
+            if code == TAG_END:
+                return
+            pos = tag.end
+
+    def rewrite(self, replacements):
+        """Segments of the uncompressed SWF with the bodies of some tags replaced.
+
+        ``replacements`` maps tags to their new bodies. Every stretch of
+        untouched tags is a memoryview slice of this file; only the replaced
+        tags and the 8 byte header (new file length) are freshly encoded.
+        """
+        data = self.data
+        segments = []
+        pos = self.HEADER_SIZE
+        for tag in sorted(replacements, key=lambda tag: tag.offset):
+            body = replacements[tag]
+            segments.append(data[pos:tag.offset])
+            segments.append(struct.pack("<HI", (tag.code << 6) | 0x3F, len(body)) + bytes(body))
+            pos = tag.end
+        segments.append(data[pos:])
+        file_length = self.HEADER_SIZE + sum(len(segment) for segment in segments)
+        return [b"FWS" + struct.pack("<BI", self.version, file_length)] + segments
+
+    def replace_tag(self, tag, body):
+        """Return the whole SWF with ``tag``'s body replaced, compressed like the original."""
+        segments = self.rewrite({tag: body})
+        if self.compression == "FWS":
+            return b"".join(segments)
+        content = b"".join(segments[1:])
+        file_length = self.HEADER_SIZE + len(content)
+        if self.compression == "CWS":
+            return b"CWS" + struct.pack("<BI", self.version, file_length) + zlib.compress(content)
+        compressor = lzma.LZMACompressor(format=lzma.FORMAT_ALONE)
+        stream = compressor.compress(content) + compressor.flush()
+        # Drop the 8 byte uncompressed size of the .lzma header; ZWS stores its own lengths.
+        raw = stream[13:]
+        return b"ZWS" + struct.pack("<BII", self.version, file_length, len(raw)) + stream[:5] + raw
+
+    def abc_tags(self):
+        return (tag for tag in self.tags() if tag.is_abc)
+
+    def find_abc_tag(self, class_name="Misc"):
+        """Return ``(tag, ABCFile)`` for the DoABC/DoABC2 tag defining ``class_name``."""
+        needle = class_name.encode("utf-8")
+        for tag in self.abc_tags():
+            abc_data = bytes(tag.abc_data)
+            if tag.abc_name.rsplit("/", 1)[-1] != class_name and needle not in abc_data:
+                continue
+            abc = ABCFile(abc_data)
+            if abc.find_class(class_name) is not None:
+                return tag, abc
+        return None, None
+
+def replace_abc_data(tag, abc_data):
+    """Tag body for ``tag`` carrying new ABC bytes, keeping the DoABC2 flags and name."""
+    prefix = bytes(tag.body[:tag.length - len(tag.abc_data)])
+    return prefix + bytes(abc_data)
+
+def find_misc_abc(swf_data):
+    """Locate the DoABC tag holding the Misc class in decompressed SWF bytes."""
+    tag, abc = SWFFile(swf_data).find_abc_tag("Misc")
+    if tag is None:
+        raise ValueError("Could not find a DoABC tag defining the Misc class")
+    return tag, abc
@@ -0,0 +1,20 @@
+import random
+import unittest
+import zlib
+
+from utils import DEFLATE_WINDOW, parallel_deflate
+
+
+class ParallelDeflateCacheTest(unittest.TestCase):
+    def test_cached_block_with_a_different_dictionary_split(self):
+        block = 1 << 16
+        data = bytearray(random.Random(0).randbytes(6 * block))
+        data[4 * block:5 * block] = data[:block]
+        cache = {}
+        self.assertEqual(zlib.decompress(parallel_deflate(data, block_size=block, cache=cache)), data)
+        compressed = parallel_deflate(data, block_size=block, cuts=(3 * block + DEFLATE_WINDOW, 5 * block), cache=cache)
+        self.assertEqual(zlib.decompress(compressed), data)
+
+
+if __name__ == "__main__":
+    unittest.main()
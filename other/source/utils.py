@@ -1,18 +1,30 @@
 import subprocess
 import os
+import io
 import zlib
 import re
 import struct
 import json
+import bisect
+import types
+import collections
+import hashlib
 import requests
 from tkinter import messagebox
 import pyparsing as pp
 from pyparsing import *
 import shutil
+import tempfile
+import contextlib
+import concurrent.futures
 import time
 import sys
 import logging
 import logging.handlers
+from swf import SWFFile, find_misc_abc, replace_abc_data
+from avm2 import decode_costume_table, encode_costume_table
+from costume import Costume, PaletteInterner, costume_fingerprint, unique_costumes, written_color, written_palettes
+from catalog import CostumeCatalog, CatalogManifest, CATALOG_EXTENSION, MANIFEST_NAME
 
 # Setup logging
 logger = logging.getLogger('SSF2CostumeInjector')
@@ -47,8 +59,104 @@ def setup_logging(app_dir, enable_file_logging=True, debug=False):
         except Exception as e:
             logger.error(f"Failed to set up file logging to {log_file}: {e}")
 
-def decompress_ssf(ssf_path, swf_path):
-    """Decompress SSF to SWF, following the logic from Main.as."""
+SSF_STREAM_CHUNK_SIZE = 64 * 1024
+
+# Backends that read and write the Misc costume table: "native" patches the ABC bytecode, "jpexs" shells out to ffdec.jar
+SCRIPT_ENGINES = ("native", "jpexs")
+
+def iter_ssf_swf_chunks(ssf_file, chunk_size=SSF_STREAM_CHUNK_SIZE, decompressor=None):
+    """Yield the SWF payload of an open SSF file as memoryview chunks.
+
+    The ``>I l, >I n`` header and the ``n*4`` index table are parsed as the
+    zlib stream is inflated, and the decompressor output is capped at
+    ``chunk_size`` per step, so memory use does not grow with the DAT size.
+    Pass a ``decompressor`` to keep reading the stream after the payload.
+    """
+    if decompressor is None:
+        decompressor = zlib.decompressobj()
+    header = bytearray()
+    swf_remaining = None
+    skip_remaining = 0
+
+    while swf_remaining != 0:
+        data = decompressor.unconsumed_tail or ssf_file.read(chunk_size)
+        # At the end of the file the decompressor may still hold output; drain it before giving up.
+        view = memoryview(decompressor.decompress(data, chunk_size))
+        if not data and not view:
+            raise ValueError("SSF data ended before the SWF payload was complete")
+
+        if swf_remaining is None:
+            needed = 8 - len(header)
+            header.extend(view[:needed])
+            view = view[needed:]
+            if len(header) < 8:
+                continue
+            swf_remaining, entries = struct.unpack(">II", header)
+            skip_remaining = entries * 4
+
+        if skip_remaining:
+            skipped = min(skip_remaining, len(view))
+            skip_remaining -= skipped
+            view = view[skipped:]
+
+        if view:
+            chunk = view[:swf_remaining]
+            swf_remaining -= len(chunk)
+            yield chunk
+
+def verify_ssf(ssf_path, expected_swf, misc_tag=None, chunk_size=SSF_STREAM_CHUNK_SIZE):
+    """Stream-decompress a written SSF and check that it holds exactly ``expected_swf``.
+
+    Every payload byte from iter_ssf_swf_chunks is compared, then the zlib
+    stream is inflated to its end so its checksum is verified. ``misc_tag``
+    (a SWFTag of ``expected_swf``) names the Misc ABC in the error when the
+    mismatch falls inside it. Raises ValueError.
+    """
+    expected = memoryview(expected_swf)
+    decompressor = zlib.decompressobj()
+    pos = 0
+
+    with open(ssf_path, "rb") as f:
+        try:
+            for view in iter_ssf_swf_chunks(f, chunk_size, decompressor):
+                if pos + len(view) > len(expected):
+                    raise ValueError(f"SWF payload is longer than the expected {len(expected)} bytes")
+                if view != expected[pos:pos + len(view)]:
+                    mismatch = pos + next(i for i in range(len(view)) if view[i] != expected[pos + i])
+                    if misc_tag is not None and misc_tag.offset <= mismatch < misc_tag.end:
+                        raise ValueError(f"Misc ABC differs from the injected bytes at SWF offset {mismatch}")
+                    raise ValueError(f"SWF differs from the saved data at offset {mismatch}")
+                pos += len(view)
+            if pos != len(expected):
+                raise ValueError(f"SWF payload is {pos} bytes, expected {len(expected)}")
+
+            while not decompressor.eof:
+                data = decompressor.unconsumed_tail or f.read(chunk_size)
+                rest = decompressor.decompress(data, chunk_size)
+                if rest:
+                    raise ValueError(f"{len(rest)} unexpected bytes after the SWF payload")
+                if not data and not decompressor.eof:
+                    raise ValueError("zlib stream is truncated")
+            if decompressor.unused_data or f.read(1):
+                raise ValueError("trailing data after the zlib stream")
+        except zlib.error as e:
+            raise ValueError(f"{ssf_path}: zlib stream is corrupt ({e})")
+        except ValueError as e:
+            raise ValueError(f"{ssf_path}: {e}")
+
+def decompress_ssf(ssf_path, swf_path, streaming=True):
+    """Decompress SSF to SWF, following the logic from Main.as.
+
+    With ``streaming`` the SSF is inflated incrementally and written straight
+    to ``swf_path``; otherwise the whole container is decompressed in memory.
+    """
+    if streaming:
+        with open(ssf_path, "rb") as src, open(swf_path, "wb") as dst:
+            for chunk in iter_ssf_swf_chunks(src):
+                dst.write(chunk)
+        print(f"Decompressed {ssf_path} to {swf_path}")
+        return
+
     with open(ssf_path, "rb") as f:
         data = f.read()
 
@@ -68,102 +176,400 @@ def decompress_ssf(ssf_path, swf_path):
         f.write(swf_data)
     print(f"Decompressed {ssf_path} to {swf_path}")
 
-def compress_swf(swf_path, ssf_path):
+def compress_swf(swf_path, ssf_path, level=-1):
     """Compress SWF to SSF, following the logic from Main.as."""
     with open(swf_path, "rb") as f:
         swf_data = f.read()
 
-    ssf_data = bytearray()
-    ssf_data.extend(struct.pack(">I", len(swf_data)))
-    ssf_data.extend(struct.pack(">I", 0))
-    ssf_data.extend(swf_data)
-
-    compressed = zlib.compress(ssf_data)
+    compressed = compress_swf_bytes(swf_data, level)
 
     with open(ssf_path, "wb") as f:
         f.write(compressed)
     print(f"Compressed {swf_path} to {ssf_path}")
 
-def extract_misc_as(swf_path, output_as_path, java_path, ffdec_jar):
+def _collect_swf_chunks(chunks):
+    swf_data = bytearray()
+    for chunk in chunks:
+        swf_data += chunk
+    return memoryview(swf_data)
+
+def decompress_ssf_bytes(ssf_data):
+    """Decompress SSF bytes in memory and return the SWF as a memoryview."""
+    return _collect_swf_chunks(iter_ssf_swf_chunks(io.BytesIO(ssf_data)))
+
+# zlib levels for saving: "fast" while iterating on costumes, "smallest" for files meant for distribution
+SSF_COMPRESSION_LEVELS = {"fast": 1, "balanced": 6, "smallest": 9}
+DEFLATE_BLOCK_SIZE = 1024 * 1024
+DEFLATE_WINDOW = 32 * 1024
+
+def _deflate_block(data, start, end, dictionary_start, level, last, cache=None):
+    """Raw-deflate data[start:end], primed with data[dictionary_start:start] like pigz.
+
+    With a cache, the block is looked up by a digest of its dictionary and
+    bytes, where the one ends and the other begins, and the settings first;
+    returns ``(key, compressed)``.
+    """
+    key = None
+    if cache is not None:
+        key = (level, last, start - dictionary_start, hashlib.sha1(data[dictionary_start:end]).digest())
+        if key in cache:
+            return key, cache[key]
+    dictionary = data[dictionary_start:start]
+    if len(dictionary):
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS, zdict=dictionary)
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    return key, compressor.compress(data[start:end]) + compressor.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+def parallel_deflate(data, level=-1, block_size=DEFLATE_BLOCK_SIZE, workers=None, cuts=(), cache=None):
+    """Compress data into a single zlib stream, deflating blocks on a thread pool.
+
+    Every block but the last ends on a sync-flush boundary, so the raw deflate
+    outputs concatenate into one valid stream that any zlib inflater (and
+    Flash's ByteArray.uncompress) reads like a zlib.compress result.
+
+    ``cuts`` are extra offsets where a block must start; no block or
+    dictionary spans one. Passing the edges of the regions that changed since
+    the last save together with that save's ``cache`` dict lets every block
+    outside those regions be reused instead of deflated again. The cache is
+    updated in place to hold the blocks of this stream.
+    """
+    data = memoryview(data)
+    if len(data) <= block_size and not cuts and cache is None:
+        return zlib.compress(data, level)
+    boundaries = sorted({0, len(data)} | {cut for cut in cuts if 0 < cut < len(data)})
+    spans = []
+    for segment_start, segment_end in zip(boundaries, boundaries[1:]):
+        for offset in range(segment_start, segment_end, block_size):
+            spans.append((offset, min(offset + block_size, segment_end), max(segment_start, offset - DEFLATE_WINDOW)))
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        adler = pool.submit(zlib.adler32, data)
+        blocks = [
+            pool.submit(_deflate_block, data, start, end, dictionary_start, level, i == len(spans) - 1, cache)
+            for i, (start, end, dictionary_start) in enumerate(spans)
+        ]
+        results = [block.result() for block in blocks]
+    if cache is not None:
+        reused = sum(1 for key, _ in results if key in cache)
+        cache.clear()
+        cache.update(results)
+        print(f"Reused {reused} of {len(results)} deflate blocks")
+    # zlib header: deflate with a 32K window, FLEVEL from the level, FCHECK making it a multiple of 31
+    flevel = 0 if level in (0, 1) else 1 if level < 6 else 2 if level in (-1, 6) else 3
+    cmf, flg = 0x78, flevel << 6
+    flg |= 31 - ((cmf << 8) | flg) % 31
+    return b"".join([bytes((cmf, flg))] + [compressed for _, compressed in results] + [struct.pack(">I", adler.result())])
+
+def compress_swf_bytes(swf_data, level=-1, cuts=(), cache=None):
+    """Compress SWF bytes to SSF bytes in memory, following the logic from Main.as.
+
+    ``cuts`` are offsets into swf_data; see parallel_deflate.
+    """
+    start_time = time.time()
+    ssf_data = bytearray(struct.pack(">II", len(swf_data), 0))
+    ssf_data += swf_data
+    cuts = [cut + 8 for cut in cuts]
+    compressed = parallel_deflate(ssf_data, level, cuts=cuts, cache=cache)
+    print(f"Compressed {len(ssf_data)} bytes to {len(compressed)} at level {level} in {time.time() - start_time:.2f} seconds")
+    return compressed
+
+def _changed_span(old, new, start=0, chunk_size=64 * 1024):
+    """Return ``(prefix, suffix)``: how many bytes from ``start`` on, and at the end, old and new share."""
+    old, new = memoryview(old), memoryview(new)
+    limit = min(len(old), len(new))
+    prefix = start
+    while prefix < limit:
+        end = min(prefix + chunk_size, limit)
+        if old[prefix:end] != new[prefix:end]:
+            while old[prefix] == new[prefix]:
+                prefix += 1
+            break
+        prefix = end
+    suffix = 0
+    limit -= prefix
+    while suffix < limit:
+        size = min(chunk_size, limit - suffix)
+        if old[len(old) - suffix - size:len(old) - suffix] != new[len(new) - suffix - size:len(new) - suffix]:
+            while suffix < limit and old[len(old) - suffix - 1] == new[len(new) - suffix - 1]:
+                suffix += 1
+            break
+        suffix += size
+    return prefix, suffix
+
+def write_file_atomic(path, data, check=None):
+    """Write data next to path and move it into place so readers never see a partial file.
+
+    ``check``, if given, is called with the temporary file's path before it
+    replaces path; an exception from it leaves path untouched.
+    """
+    path = os.path.abspath(path)
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        if check is not None:
+            check(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def run_ffdec(args, java_path, ffdec_jar, worker=None):
+    """Run an FFDec command line, through the session's JPEXS worker when one is given."""
+    if worker is not None:
+        return worker.run(args)
+    cmd = [java_path, "-jar", ffdec_jar] + args
+    print(f"Executing command: {' '.join(cmd)}")
+    return subprocess.run(cmd, check=True, capture_output=True, text=True).stdout
+
+def extract_misc_as(swf_path, output_as_path, java_path, ffdec_jar, worker=None):
     """Extract Misc.as from SWF using JPEXS CLI."""
     swf_path = os.path.abspath(swf_path)
     output_as_path = os.path.abspath(output_as_path)
     output_dir = os.getcwd()
 
-    cmd = [
-        java_path,
-        "-jar",
-        ffdec_jar,
+    args = [
         "-export",
         "script",
         output_dir,
         swf_path,
         "misc.as"
     ]
-    print(f"Executing command: {' '.join(cmd)}")
     try:
-        result = subprocess.run(cmd, check=True, capture_output=True, text=True)
-        print(f"Extracted Misc.as: {result.stdout}")
+        output = run_ffdec(args, java_path, ffdec_jar, worker)
+        print(f"Extracted Misc.as: {output}")
     except subprocess.CalledProcessError as e:
         print(f"Error extracting Misc.as: {e.stderr}")
         raise
 
-def inject_misc_as(swf_path, new_as_path, output_swf_path, java_path, ffdec_jar):
+def inject_misc_as(swf_path, new_as_path, output_swf_path, java_path, ffdec_jar, worker=None):
     """Inject modified Misc.as into SWF using JPEXS CLI."""
     swf_path = os.path.abspath(swf_path)
     new_as_path = os.path.abspath(new_as_path)
     output_swf_path = os.path.abspath(output_swf_path)
 
-    cmd = [
-        java_path,
-        "-jar",
-        ffdec_jar,
+    args = [
         "-replace",
         swf_path,
         output_swf_path,
         "Misc",
         new_as_path
     ]
-    print(f"Executing command: {' '.join(cmd)}")
     try:
-        result = subprocess.run(cmd, check=True, capture_output=True, text=True)
-        print(f"Injected Misc.as: {result.stdout}")
+        output = run_ffdec(args, java_path, ffdec_jar, worker)
+        print(f"Injected Misc.as: {output}")
     except subprocess.CalledProcessError as e:
         print(f"Error injecting Misc.as: {e.stderr}")
         raise
 
+class SSFSession:
+    """Keeps the decompressed SWF of an SSF file in memory for an editing session.
+
+    JPEXS only works on files, so each JPEXS call gets a private temporary copy
+    of the SWF that is removed afterwards; the SSF itself is only written by save().
+    """
+    def __init__(self, ssf_path=None):
+        self.ssf_path = ssf_path
+        self.swf = None
+        self.modified = False
+        self._saved_swf = None
+        self._deflate_cache = {}
+        if ssf_path:
+            self.load(ssf_path)
+
+    def load(self, ssf_path):
+        with open(ssf_path, "rb") as f:
+            self.swf = _collect_swf_chunks(iter_ssf_swf_chunks(f))
+        self.ssf_path = ssf_path
+        self.modified = False
+        self._saved_swf = self.swf
+        self._deflate_cache = {}
+        print(f"Loaded {ssf_path} into memory ({len(self.swf)} byte SWF)")
+
+    @contextlib.contextmanager
+    def swf_file(self):
+        """Expose the in-memory SWF as a temporary file for the duration of the block."""
+        temp_dir = tempfile.mkdtemp(prefix="ssf2ci-")
+        try:
+            swf_path = os.path.join(temp_dir, "session.swf")
+            with open(swf_path, "wb") as f:
+                f.write(self.swf)
+            yield swf_path
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    def find_misc_abc(self):
+        """Return ``(tag, ABCFile)`` for the Misc class without launching Java."""
+        return find_misc_abc(self.swf)
+
+    def read_costume_table(self):
+        """Decode the Misc costume table straight from the ABC bytecode."""
+        tag, abc = self.find_misc_abc()
+        return decode_costume_table(abc)
+
+    def inject_costume_table(self, as_path, characters):
+        """Write the costumes of ``characters`` from Misc.as into the bytecode without JPEXS.
+
+        Only the costume method body and appended constant-pool entries change;
+        the DoABC tag is re-serialised in place and every other tag is kept.
+        """
+        start_time = time.time()
+        swf = SWFFile(self.swf)
+        tag, abc = swf.find_abc_tag("Misc")
+        if tag is None:
+            raise ValueError("Could not find a DoABC tag defining the Misc class")
+        table = decode_costume_table(abc)
+        updated = dict(table.characters)
+        updated.update(read_misc_as_costumes(as_path, characters))
+        abc_data = encode_costume_table(abc, table, updated)
+        if swf.compression == "FWS":
+            self.swf = _collect_swf_chunks(swf.rewrite({tag: replace_abc_data(tag, abc_data)}))
+        else:
+            self.swf = memoryview(swf.replace_tag(tag, replace_abc_data(tag, abc_data)))
+        self.modified = True
+        print(f"Patched costume table for {', '.join(characters)} in {time.time() - start_time:.2f} seconds")
+
+    def write_native_misc_as(self, output_as_path):
+        """Write a Misc.as rendered from the decoded costume table, no JPEXS involved."""
+        table = self.read_costume_table()
+        with open(output_as_path, "w", encoding="utf-8") as f:
+            f.write(render_misc_as(table.characters))
+        return table
+
+    def extract_misc_as(self, output_as_path, java_path, ffdec_jar, worker=None):
+        with self.swf_file() as swf_path:
+            extract_misc_as(swf_path, output_as_path, java_path, ffdec_jar, worker)
+
+    def inject_misc_as(self, new_as_path, java_path, ffdec_jar, worker=None):
+        with self.swf_file() as swf_path:
+            output_swf_path = os.path.join(os.path.dirname(swf_path), "modified.swf")
+            inject_misc_as(swf_path, new_as_path, output_swf_path, java_path, ffdec_jar, worker)
+            with open(output_swf_path, "rb") as f:
+                self.swf = memoryview(f.read())
+        self.modified = True
+
+    def save(self, ssf_path=None, level=-1, verify=True):
+        """Compress the session SWF and atomically replace the SSF file.
+
+        Only the part of the SWF that changed since the last load or save is
+        deflated again; the compressed blocks of everything around it are reused.
+        With ``verify`` the temporary file is read back with verify_ssf before
+        it replaces the SSF, so a bad write never reaches the game directory.
+        """
+        ssf_path = ssf_path or self.ssf_path
+        cuts = [8]
+        if self._saved_swf is not None and len(self._saved_swf) > 8:
+            prefix, suffix = _changed_span(self._saved_swf, self.swf, start=8)
+            cuts += [prefix, len(self.swf) - suffix]
+        write_file_atomic(ssf_path, compress_swf_bytes(self.swf, level, cuts=cuts, cache=self._deflate_cache),
+                          check=self.verify if verify else None)
+        self._saved_swf = self.swf
+        self.ssf_path = ssf_path
+        self.modified = False
+        print(f"Saved in-memory SWF to {ssf_path}")
+
+    def verify(self, ssf_path=None):
+        """Check that the SSF on disk holds exactly the session SWF."""
+        ssf_path = ssf_path or self.ssf_path
+        start_time = time.time()
+        misc_tag = None
+        try:
+            swf = SWFFile(self.swf)
+            if swf.compression == "FWS":
+                misc_tag = swf.find_abc_tag("Misc")[0]
+        except ValueError:
+            pass
+        verify_ssf(ssf_path, self.swf, misc_tag)
+        print(f"Verified {ssf_path} in {time.time() - start_time:.2f} seconds")
+
+MISC_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+class MiscAsCache:
+    """On-disk store of extracted Misc.as files keyed by the SHA-256 of the SSF.
+
+    index.json remembers the size, mtime and digest last seen for each SSF
+    path, so an unchanged file is recognised without reading it. Entries are
+    named ``<digest>-<kind>.as`` where kind is the engine that produced them
+    ("jpexs" or "native"), and the least recently used ones are evicted once
+    the store grows past max_bytes.
+    """
+    def __init__(self, cache_dir, max_bytes=MISC_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(cache_dir, "index.json")
+        os.makedirs(cache_dir, exist_ok=True)
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                self.index = json.load(f)
+        except (OSError, ValueError):
+            self.index = {}
+
+    def ssf_digest(self, ssf_path):
+        ssf_path = os.path.abspath(ssf_path)
+        stat = os.stat(ssf_path)
+        known = self.index.get(ssf_path)
+        if known and known["size"] == stat.st_size and known["mtime_ns"] == stat.st_mtime_ns:
+            return known["sha256"]
+        start_time = time.time()
+        digest = hashlib.sha256()
+        with open(ssf_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        self.index[ssf_path] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest.hexdigest()}
+        write_file_atomic(self.index_path, json.dumps(self.index, indent=2).encode("utf-8"))
+        print(f"Hashed {ssf_path} in {time.time() - start_time:.2f} seconds")
+        return digest.hexdigest()
+
+    def _entry_path(self, ssf_path, kind):
+        return os.path.join(self.cache_dir, f"{self.ssf_digest(ssf_path)}-{kind}.as")
+
+    def get(self, ssf_path, kind, output_as_path):
+        """Copy the cached Misc.as for ssf_path to output_as_path; returns False on a miss."""
+        entry = self._entry_path(ssf_path, kind)
+        if not os.path.exists(entry):
+            return False
+        os.makedirs(os.path.dirname(os.path.abspath(output_as_path)), exist_ok=True)
+        shutil.copyfile(entry, output_as_path)
+        os.utime(entry)
+        print(f"Loaded Misc.as for {ssf_path} from cache ({kind})")
+        return True
+
+    def put(self, ssf_path, kind, as_path):
+        with open(as_path, "rb") as f:
+            write_file_atomic(self._entry_path(ssf_path, kind), f.read())
+        self.evict()
+
+    def evict(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".as"):
+                stat = os.stat(os.path.join(self.cache_dir, name))
+                entries.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(os.path.join(self.cache_dir, name))
+            total -= size
+            print(f"Evicted cached Misc.as {name}")
+
 def modify_misc_as(original_as_path, new_as_path, costume_data, character):
     """Modify Misc.as to add a new costume for the selected character."""
-    with open(original_as_path, "r", encoding="utf-8") as f:
-        content = f.read()
+    index = MiscIndex.for_file(original_as_path)
+    content = index.content
+    emitter = CostumeEmitter()
 
-    pattern = f'_loc1_\\["{re.escape(character)}"\\]\\.push\\({{'
-    character_entries = list(re.finditer(pattern, content))
+    character_entries = index.pushes.get(character)
     if not character_entries:
-        end_of_loc1 = content.rfind('};')
-        if end_of_loc1 == -1:
-            raise ValueError("Could not find end of _loc1_ array in Misc.as")
-
-        palette_swap_colors = ",".join(map(str, costume_data["paletteSwap"]["colors"]))
-        palette_swap_replacements = ",".join(map(str, costume_data["paletteSwap"]["replacements"]))
-        palette_swap_pa_colors = ",".join(map(str, costume_data["paletteSwapPA"]["colors"]))
-        palette_swap_pa_replacements = ",".join(map(str, costume_data["paletteSwapPA"]["replacements"]))
-
-        new_character_entry = f'\n         _loc1_["{character}"] = new Array();\n' \
-                             f'         _loc1_["{character}"].push({{\n' \
-                             f'            "paletteSwap":{{' \
-                             f'\n               "colors":[{palette_swap_colors}],' \
-                             f'\n               "replacements":[{palette_swap_replacements}]' \
-                             f'\n            }},\n' \
-                             f'            "paletteSwapPA":{{' \
-                             f'\n               "colors":[{palette_swap_pa_colors}],' \
-                             f'\n               "replacements":[{palette_swap_pa_replacements}]' \
-                             f'\n            }}\n' \
-                             f'         }});\n'
+        end_of_loc1 = index.insertion_point()
+        new_character_entry = "\n" + emitter.array(character) + emitter.push(character, {}, *_palette_text(costume_data))
         print(f"Generated new character entry for {character}")
         new_content = content[:end_of_loc1] + new_character_entry + content[end_of_loc1:]
     else:
-        last_entry_start = character_entries[-1].end()
+        last_entry_start = character_entries[-1][0] + len(f'_loc1_["{character}"].push({{')
         brace_count = 1
         pos = last_entry_start
         while pos < len(content) and brace_count > 0:
@@ -182,27 +588,11 @@ def modify_misc_as(original_as_path, new_as_path, costume_data, character):
         lines_before_insertion = content[:pos].count('\n') + 1
         print(f"Inserting new entry at line {lines_before_insertion}")
 
-        palette_swap_colors = ",".join(map(str, costume_data["paletteSwap"]["colors"]))
-        palette_swap_replacements = ",".join(map(str, costume_data["paletteSwap"]["replacements"]))
-        palette_swap_pa_colors = ",".join(map(str, costume_data["paletteSwapPA"]["colors"]))
-        palette_swap_pa_replacements = ",".join(map(str, costume_data["paletteSwapPA"]["replacements"]))
-
-        new_entry = f'\n         }});\n' \
-                    f'\n         _loc1_["{character}"].push({{\n' \
-                    f'            "paletteSwap":{{' \
-                    f'\n               "colors":[{palette_swap_colors}],' \
-                    f'\n               "replacements":[{palette_swap_replacements}]' \
-                    f'\n            }},\n' \
-                    f'            "paletteSwapPA":{{' \
-                    f'\n               "colors":[{palette_swap_pa_colors}],' \
-                    f'\n               "replacements":[{palette_swap_pa_replacements}]' \
-                    f'\n            }}\n' \
-                    f'         }});\n'
+        new_entry = f'\n{emitter.indent}}});\n\n' + emitter.push(character, {}, *_palette_text(costume_data))
         print(f"Generated new entry for {character}")
         new_content = content[:end_of_push] + new_entry + content[end_of_push + 2:]
 
-    with open(new_as_path, "w", encoding="utf-8") as f:
-        f.write(new_content)
+    MiscIndex.write(new_as_path, new_content)
     print(f"Modified Misc.as with new costume for {character} at {new_as_path}")
 def resource_path(relative_path):
     """Resolve path for resources, handling PyInstaller bundles."""
@@ -212,18 +602,168 @@ def resource_path(relative_path):
         base_path = os.path.abspath(".")
     return os.path.join(base_path, relative_path)
 
+MISC_STATEMENT_PATTERN = re.compile(r'_loc1_\["([^"]+)"\]( = new Array\(\);|\.push\(\{)?')
+
+class MiscIndex:
+    """Where each character's costume table statements sit in a Misc.as.
+
+    Built in one pass over the text: ``arrays`` maps a character to the
+    (start, end) of its ``new Array()`` statement and ``pushes`` to the
+    ordered (start, end) spans of its ``push({...});`` statements. Indexes
+    are kept per path and reused until the file's size or mtime changes.
+    """
+    _cache = {}
+
+    def __init__(self, content):
+        self.content = content
+        self.names = set()
+        self.arrays = {}
+        self.pushes = {}
+        self.table_end = -1
+        self._scan(0, len(content))
+
+    def _scan(self, pos, stop):
+        """Record the statements that start in content[pos:stop]."""
+        content = self.content
+        while True:
+            match = MISC_STATEMENT_PATTERN.search(content, pos)
+            if match is None or match.start() >= stop:
+                break
+            character, statement = match.group(1), match.group(2)
+            self.names.add(character)
+            pos = match.end()
+            if statement == " = new Array();":
+                self.arrays.setdefault(character, (match.start(), pos))
+            elif statement is not None:
+                end = content.find("});", pos)
+                if end == -1:
+                    break
+                pos = end + 3
+                self.pushes.setdefault(character, []).append((match.start(), pos))
+            statement_end = content.find(");\n", pos - 2)
+            if statement_end != -1:
+                self.table_end = statement_end + 3
+
+    @classmethod
+    def for_file(cls, as_path):
+        """The index of ``as_path``, rebuilt only if the file changed since it was last indexed."""
+        if not os.path.exists(as_path):
+            raise FileNotFoundError(f"Misc.as not found at {as_path}")
+        key = os.path.abspath(as_path)
+        stat = os.stat(as_path)
+        cached = cls._cache.get(key)
+        if cached is not None and cached[0] == (stat.st_size, stat.st_mtime_ns):
+            return cached[1]
+        with open(as_path, "r", encoding="utf-8") as f:
+            index = cls(f.read())
+        cls._cache[key] = ((stat.st_size, stat.st_mtime_ns), index)
+        return index
+
+    @classmethod
+    def write(cls, as_path, content, index=None):
+        """Atomically write Misc.as content and cache its index (built from content unless given)."""
+        write_file_atomic(as_path, content.encode("utf-8"))
+        stat = os.stat(as_path)
+        cls._cache[os.path.abspath(as_path)] = ((stat.st_size, stat.st_mtime_ns), index or cls(content))
+
+    def splice(self, start, end, pieces):
+        """Index of the content with [start, end) replaced by ``pieces``; see splice_regions."""
+        return self.splice_regions([(start, end, pieces)])
+
+    def splice_regions(self, regions):
+        """Replace several (start, end, pieces) regions in one pass over the content.
+
+        Regions must not overlap; insertions (start == end) at the same
+        offset keep their order. Returns ``(content, index)``, where only the
+        new text is scanned and statements outside the regions keep their
+        spans, shifted. The whole result is rescanned if a statement
+        straddles a region edge.
+        """
+        regions = sorted(((start, end, "".join(pieces)) for start, end, pieces in regions), key=lambda region: region[:2])
+        out = []
+        placed = []
+        pos = length = 0
+        for start, end, text in regions:
+            if start < pos:
+                raise ValueError(f"Overlapping Misc.as regions at offset {start}")
+            out.append(self.content[pos:start])
+            length += start - pos
+            placed.append((start, end, length, len(text)))
+            out.append(text)
+            length += len(text)
+            pos = end
+        out.append(self.content[pos:])
+        content = "".join(out)
+
+        ends = [end for _, end, _, _ in placed]
+        deltas = [0]
+        for start, end, new_start, new_length in placed:
+            deltas.append(deltas[-1] + new_length - (end - start))
+
+        def shift(span):
+            # Regions ending at or before the span move it; the next one must start after it
+            k = bisect.bisect_right(ends, span[0])
+            if k < len(placed) and placed[k][0] < span[1]:
+                return None
+            return span[0] + deltas[k], span[1] + deltas[k]
+
+        index = MiscIndex.__new__(MiscIndex)
+        index.content = content
+        index.names = set(self.names)
+        index.arrays = {}
+        index.pushes = {}
+        index.table_end = -1
+        for _, _, new_start, new_length in placed:
+            index._scan(new_start, new_start + new_length)
+        scanned_end = index.table_end
+
+        for character, span in self.arrays.items():
+            span = shift(span)
+            if span is None:
+                return content, MiscIndex(content)
+            if character not in index.arrays or span[0] < index.arrays[character][0]:
+                index.arrays[character] = span
+        for character, spans in self.pushes.items():
+            shifted = [shift(span) for span in spans]
+            if None in shifted:
+                return content, MiscIndex(content)
+            index.pushes[character] = sorted(index.pushes.get(character, []) + shifted)
+        if self.table_end != -1:
+            table_end = shift((self.table_end, self.table_end))
+            if table_end is None:
+                return content, MiscIndex(content)
+            index.table_end = max(scanned_end, table_end[0])
+        return content, index
+
+    def characters(self):
+        return sorted(self.names)
+
+    def costume_count(self, character):
+        return len(self.pushes.get(character, ()))
+
+    def costume_literals(self, character, start=0, stop=None):
+        """The ``{...}`` object literal of each push statement for ``character``, in order."""
+        prefix = len(f'_loc1_["{character}"].push(')
+        spans = self.pushes.get(character, [])[start:stop]
+        return [self.content[begin + prefix:end - 2] for begin, end in spans]
+
+    def insertion_point(self):
+        """Offset where a new character's statements go, as modify_misc_as and update_costumes expect."""
+        end_of_loc1 = self.content.rfind('};')
+        if end_of_loc1 == -1:
+            # Misc.as rendered from bytecode has no object literal; append after the last table statement
+            if self.table_end == -1:
+                raise ValueError("Could not find end of _loc1_ array in Misc.as")
+            end_of_loc1 = self.table_end
+        return end_of_loc1
+
 def extract_character_names(as_path):
     """Extract character names from Misc.as."""
-    if not os.path.exists(as_path):
-        raise FileNotFoundError(f"Misc.as not found at {as_path}")
+    return MiscIndex.for_file(as_path).characters()
 
-    with open(as_path, "r", encoding="utf-8") as f:
-        content = f.read()
-
-    pattern = r'_loc1_\["([^"]+)"\]'
-    matches = re.findall(pattern, content)
-    characters = sorted(list(set(matches)))
-    return characters
+def count_costumes(as_path, character):
+    """Number of costumes ``character`` has in Misc.as, without parsing them."""
+    return MiscIndex.for_file(as_path).costume_count(character)
 
 def parse_as3_object(s):
     LBRACE, RBRACE, LBRACK, RBRACK, COLON, COMMA = map(pp.Suppress, "{}[]:,")
@@ -262,41 +802,480 @@ def as3_to_dict(parsed):
     else:
         return parsed
 
-def extract_costumes(as_path, character):
-    start_time = time.time()
-    if not os.path.exists(as_path):
-        raise FileNotFoundError(f"Misc.as not found at {as_path}")
+# Parser used by extract_costumes: "fast" (parse_as3_literal) or "pyparsing" (parse_as3_object + as3_to_dict),
+# the latter kept for differential testing
+AS3_PARSER = "fast"
+
+_AS3_WHITESPACE = re.compile(r"\s*")
+_AS3_NUMBER = re.compile(r"0x[0-9A-Fa-f]+|[+-]?(?:\d+\.\d*|\.\d+|\d+)(?:[eE][+-]?\d+)?")
+_AS3_STRING = re.compile(r'"((?:[^"\\\n\r]|\\.)*)"|\'((?:[^\'\\\n\r]|\\.)*)\'')
+_AS3_KEY = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+_AS3_KEYWORDS = {"true": True, "false": False, "null": "null", "NaN": float("nan")}
+# For the ABC writer, which must tell a bare null (pushnull) from the string "null"
+_AS3_VALUE_KEYWORDS = dict(_AS3_KEYWORDS, null=None)
+
+def _parse_as3_value(s, pos, keywords=_AS3_KEYWORDS):
+    """Parse one value starting at a non-space character; returns (value, end)."""
+    char = s[pos:pos + 1]
+    if char == "{":
+        result = {}
+        pos = _AS3_WHITESPACE.match(s, pos + 1).end()
+        if s.startswith("}", pos):
+            return result, pos + 1
+        while True:
+            match = _AS3_STRING.match(s, pos) or _AS3_KEY.match(s, pos)
+            if match is None:
+                raise ValueError(f"Expected a key at position {pos}")
+            key = match.group(0) if match.lastindex is None else match.group(match.lastindex)
+            pos = _AS3_WHITESPACE.match(s, match.end()).end()
+            if not s.startswith(":", pos):
+                raise ValueError(f"Expected ':' at position {pos}")
+            pos = _AS3_WHITESPACE.match(s, pos + 1).end()
+            result[key], pos = _parse_as3_value(s, pos, keywords)
+            pos = _AS3_WHITESPACE.match(s, pos).end()
+            if s.startswith(",", pos):
+                pos = _AS3_WHITESPACE.match(s, pos + 1).end()
+            elif s.startswith("}", pos):
+                return result, pos + 1
+            else:
+                raise ValueError(f"Expected ',' or '}}' at position {pos}")
+    if char == "[":
+        result = []
+        pos = _AS3_WHITESPACE.match(s, pos + 1).end()
+        if s.startswith("]", pos):
+            return result, pos + 1
+        while True:
+            value, pos = _parse_as3_value(s, pos, keywords)
+            result.append(value)
+            pos = _AS3_WHITESPACE.match(s, pos).end()
+            if s.startswith(",", pos):
+                pos = _AS3_WHITESPACE.match(s, pos + 1).end()
+            elif s.startswith("]", pos):
+                return result, pos + 1
+            else:
+                raise ValueError(f"Expected ',' or ']' at position {pos}")
+    if char in ('"', "'"):
+        match = _AS3_STRING.match(s, pos)
+        if match is None:
+            raise ValueError(f"Unterminated string at position {pos}")
+        return match.group(match.lastindex), match.end()
+    match = _AS3_NUMBER.match(s, pos)
+    if match is not None:
+        text = match.group(0)
+        if text.startswith("0x"):
+            return int(text, 16), match.end()
+        if "." in text or "e" in text or "E" in text:
+            return float(text), match.end()
+        return int(text), match.end()
+    match = _AS3_KEY.match(s, pos)
+    if match is not None and match.group(0) in keywords:
+        return keywords[match.group(0)], match.end()
+    raise ValueError(f"Unexpected {char!r} at position {pos}")
+
+def parse_as3_literal(s, keywords=_AS3_KEYWORDS):
+    """Parse a Misc.as object literal straight into dicts, lists and scalars.
+
+    Handles the subset the costume table uses (numbers, 0x hex, quoted
+    strings, bare keys, true/false/null, arrays, objects) in one pass. Values
+    match as3_to_dict(parse_as3_object(s)[0]): strings keep their escapes and
+    null is the string "null" unless ``keywords`` maps it otherwise. Raises
+    ValueError on anything else.
+    """
+    pos = _AS3_WHITESPACE.match(s).end()
+    if not s.startswith("{", pos):
+        raise ValueError(f"Expected '{{' at position {pos}")
+    value, pos = _parse_as3_value(s, pos, keywords)
+    pos = _AS3_WHITESPACE.match(s, pos).end()
+    if pos != len(s):
+        raise ValueError(f"Unexpected {s[pos]!r} at position {pos}")
+    return value
+
+def parse_costume_literal(s):
+    """Parse one costume literal with the parser selected by AS3_PARSER."""
+    if AS3_PARSER == "pyparsing":
+        return as3_to_dict(parse_as3_object(s)[0])
+    return parse_as3_literal(s)
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return types.MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+def thaw(value):
+    """Mutable copy of a costume returned by CostumeParseCache."""
+    if isinstance(value, types.MappingProxyType):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [thaw(item) for item in value]
+    return value
+
+class CostumeParseCache:
+    """Bounded LRU of parsed costume literals keyed by a hash of their source text.
+
+    Parsed costumes are stored frozen (read-only mappings and tuples) so a
+    cached entry cannot be changed by whoever received it; use thaw() for
+    an editable copy.
+    """
+    def __init__(self, max_entries=8192):
+        self.max_entries = max_entries
+        self.entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def parse(self, literal):
+        key = (AS3_PARSER, hashlib.blake2b(literal.encode("utf-8"), digest_size=16).digest())
+        costume = self.entries.get(key)
+        if costume is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return costume
+        costume = _freeze(parse_costume_literal(literal))
+        self.misses += 1
+        self.entries[key] = costume
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return costume
+
+    def stats(self):
+        return f"{self.hits} hits, {self.misses} misses, {len(self.entries)} entries"
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = self.misses = 0
+
+COSTUME_PARSE_CACHE = CostumeParseCache()
+
+# Top-level costume keys the costume list shows; everything else waits for LazyCostume.load()
+COSTUME_METADATA_KEYS = ("info", "team", "base")
+_AS3_SKIP = re.compile(r'[^\[\]{}"\']+|"(?:[^"\\\n\r]|\\.)*"|\'(?:[^\'\\\n\r]|\\.)*\'|.')
+
+def _skip_as3_value(s, pos):
+    """End of the array or object starting at s[pos], without building it."""
+    depth = 0
+    for match in _AS3_SKIP.finditer(s, pos):
+        token = match.group(0)
+        if token == "[" or token == "{":
+            depth += 1
+        elif token == "]" or token == "}":
+            depth -= 1
+            if depth == 0:
+                return match.end()
+    raise ValueError(f"Unterminated value at position {pos}")
+
+def scan_costume_metadata(s, keys=COSTUME_METADATA_KEYS):
+    """Read only the top-level scalar ``keys`` of a costume literal, skipping nested arrays and objects."""
+    metadata = {}
+    pos = _AS3_WHITESPACE.match(s).end()
+    if not s.startswith("{", pos):
+        raise ValueError(f"Expected '{{' at position {pos}")
+    pos = _AS3_WHITESPACE.match(s, pos + 1).end()
+    if s.startswith("}", pos):
+        return metadata
+    while True:
+        match = _AS3_STRING.match(s, pos) or _AS3_KEY.match(s, pos)
+        if match is None:
+            raise ValueError(f"Expected a key at position {pos}")
+        key = match.group(0) if match.lastindex is None else match.group(match.lastindex)
+        pos = _AS3_WHITESPACE.match(s, match.end()).end()
+        if not s.startswith(":", pos):
+            raise ValueError(f"Expected ':' at position {pos}")
+        pos = _AS3_WHITESPACE.match(s, pos + 1).end()
+        if s.startswith("[", pos) or s.startswith("{", pos):
+            end = _skip_as3_value(s, pos)
+            if key in keys:
+                metadata[key] = _parse_as3_value(s, pos)[0]
+            pos = end
+        elif key in keys:
+            metadata[key], pos = _parse_as3_value(s, pos)
+        else:
+            pos = _parse_as3_value(s, pos)[1]
+        pos = _AS3_WHITESPACE.match(s, pos).end()
+        if s.startswith(",", pos):
+            pos = _AS3_WHITESPACE.match(s, pos + 1).end()
+        elif s.startswith("}", pos):
+            return metadata
+        else:
+            raise ValueError(f"Expected ',' or '}}' at position {pos}")
+
+class LazyCostume(dict):
+    """A costume dict that holds only its list metadata until it is used.
+
+    Created from a Misc.as literal with the ``info``/``team``/``base`` keys
+    already read; membership tests and lookups of those keys (and of keys
+    set afterwards, like ``display_name``) answer without parsing. Any other
+    access parses the literal through COSTUME_PARSE_CACHE first, keeping
+    values assigned in the meantime.
+    """
+    def __init__(self, metadata=(), literal=None):
+        super().__init__(metadata)
+        self._literal = literal
+        self._fingerprint = None
+
+    def fingerprint(self):
+        """costume_fingerprint of this costume, without loading the dict.
+
+        Cached until a key is set or removed.
+        """
+        if self._fingerprint is None:
+            if self._literal is not None:
+                costume = thaw(COSTUME_PARSE_CACHE.parse(self._literal))
+                costume.update(dict.items(self))
+            else:
+                costume = dict(self)
+            self._fingerprint = costume_fingerprint(costume) or b""
+        return self._fingerprint or None
+
+    @property
+    def loaded(self):
+        return self._literal is None
+
+    def load(self):
+        if self._literal is not None:
+            literal, self._literal = self._literal, None
+            assigned = dict(super().items())
+            dict.clear(self)
+            dict.update(self, thaw(COSTUME_PARSE_CACHE.parse(literal)))
+            dict.update(self, assigned)
+        return self
+
+    def __getitem__(self, key):
+        if self._literal is not None and not dict.__contains__(self, key) and key not in COSTUME_METADATA_KEYS:
+            self.load()
+        return super().__getitem__(key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key):
+        if self._literal is not None and not dict.__contains__(self, key) and key not in COSTUME_METADATA_KEYS:
+            self.load()
+        return super().__contains__(key)
+
+    def __setitem__(self, key, value):
+        self._fingerprint = None
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self._fingerprint = None
+        super(LazyCostume, self.load()).__delitem__(key)
+
+    def pop(self, *args):
+        self._fingerprint = None
+        return super(LazyCostume, self.load()).pop(*args)
 
-    with open(as_path, "r", encoding="utf-8") as f:
-        content = f.read()
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
 
+    def __iter__(self):
+        return super(LazyCostume, self.load()).__iter__()
+
+    def __len__(self):
+        return super(LazyCostume, self.load()).__len__()
+
+    def keys(self):
+        return super(LazyCostume, self.load()).keys()
+
+    def values(self):
+        return super(LazyCostume, self.load()).values()
+
+    def items(self):
+        return super(LazyCostume, self.load()).items()
+
+    def copy(self):
+        return dict(self.load().items())
+
+    def __eq__(self, other):
+        if isinstance(other, LazyCostume):
+            other.load()
+        return super(LazyCostume, self.load()).__eq__(other)
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    __hash__ = None
+
+    def __repr__(self):
+        return super(LazyCostume, self.load()).__repr__()
+
+    def __reduce__(self):
+        return (dict, (self.copy(),))
+
+def set_display_name(costume, no_info_counter):
+    """Label a costume for the list view; returns the updated "No Info" counter."""
+    if "team" in costume:
+        costume["display_name"] = f"Team {costume['team'].capitalize()}"
+    elif "base" in costume and costume["base"]:
+        costume["display_name"] = "Base"
+    elif "info" in costume:
+        costume["display_name"] = costume["info"]
+    else:
+        costume["display_name"] = f"No Info #{no_info_counter}"
+        no_info_counter += 1
+    return no_info_counter
+
+def extract_costumes_from_table(table, character):
+    """Return the costumes of ``character`` from a decoded CostumeTable, like extract_costumes."""
     costumes = []
-    pattern = f'_loc1_\\["{re.escape(character)}"\\]\\.push\\({{(.*?)}}\\);'
-    matches = re.finditer(pattern, content, re.DOTALL)
     no_info_counter = 1
+    for costume in table.characters.get(character, []):
+        costume = json.loads(json.dumps(costume))
+        no_info_counter = set_display_name(costume, no_info_counter)
+        costumes.append(costume)
+    return costumes
 
-    for match in matches:
-        costume_str = "{" + match.group(1).strip() + "}"
+def _unescape_as3(value):
+    """Undo the string escaping of a Misc.as literal parsed by parse_as3_object."""
+    if isinstance(value, dict):
+        return {key: _unescape_as3(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_unescape_as3(item) for item in value]
+    if isinstance(value, str):
+        return re.sub(r'\\(.)', lambda m: {"n": "\n", "r": "\r", "t": "\t"}.get(m.group(1), m.group(1)), value)
+    return value
+
+def read_misc_as_costumes(as_path, characters):
+    """Read the costumes of ``characters`` from Misc.as as plain values for the ABC writer.
+
+    A bare null comes back as None, so it is written as pushnull rather
+    than the string "null".
+    """
+    index = MiscIndex.for_file(as_path)
+    tables = {}
+    for character in characters:
+        costumes = []
+        for literal in index.costume_literals(character):
+            costume = parse_as3_literal(literal, _AS3_VALUE_KEYWORDS)
+            costume.pop("display_name", None)
+            costumes.append(_unescape_as3(costume))
+        tables[character] = costumes
+    return tables
+
+def format_as3_value(value, indent="         "):
+    """Render a decoded costume value as an ActionScript literal in JPEXS layout."""
+    if isinstance(value, dict):
+        inner = indent + "   "
+        items = [f'{inner}"{key}":{format_as3_value(item, inner)}' for key, item in value.items()]
+        return "{\n" + ",\n".join(items) + "\n" + indent + "}" if items else "{}"
+    if isinstance(value, list):
+        return "[" + ",".join(format_as3_value(item, indent) for item in value) + "]"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if value is None:
+        return "null"
+    if isinstance(value, str):
+        escaped = value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n").replace("\r", "\\r")
+        return f'"{escaped}"'
+    if isinstance(value, float) and value != value:
+        return "NaN"
+    return str(value)
+
+def render_misc_as(characters):
+    """Render a Misc.as equivalent to the JPEXS export for a decoded costume table.
+
+    Only the costume table is reproduced, which is all extract_costumes and
+    update_costumes look at.
+    """
+    lines = [
+        "package",
+        "{",
+        "   public class Misc",
+        "   {",
+        "      public static function getCostumes() : Object",
+        "      {",
+        "         var _loc1_:Object = new Object();",
+    ]
+    for character, costumes in characters.items():
+        lines.append(f'         _loc1_["{character}"] = new Array();')
+        for costume in costumes:
+            lines.append(f'         _loc1_["{character}"].push({format_as3_value(costume)});')
+    lines += [
+        "         return _loc1_;",
+        "      }",
+        "   }",
+        "}",
+        "",
+    ]
+    return "\n".join(lines)
+
+def extract_costumes(as_path, character, lazy=False):
+    """Parse the costumes of ``character`` from Misc.as, labelled for the costume list.
+
+    With ``lazy`` each costume is a LazyCostume that only reads its list
+    metadata now and parses its palettes on first use.
+    """
+    start_time = time.time()
+    index = MiscIndex.for_file(as_path)
+    costumes, _ = _parse_costume_literals(index.costume_literals(character), lazy)
+    end_time = time.time()
+    print(f"Extracted {len(costumes)} costumes in {end_time - start_time:.2f} seconds")
+    logger.debug(f"Costume parse cache: {COSTUME_PARSE_CACHE.stats()}")
+    return costumes
+
+# Position in a character's costume spans; no_info_counter carries the "No Info #n" numbering across pages
+CostumeCursor = collections.namedtuple("CostumeCursor", ["character", "position", "no_info_counter"])
+
+def page_costumes(as_path, character, cursor=None, limit=50, lazy=True):
+    """Parse one page of ``character``'s costumes from Misc.as.
+
+    Returns ``(costumes, next_cursor, total)``. Only the spans of the page
+    are parsed; ``total`` comes from the MiscIndex. Pass ``next_cursor``
+    back for the following page; it is None once every costume was
+    returned. A ``limit`` of None reads everything after the cursor.
+    """
+    start_time = time.time()
+    index = MiscIndex.for_file(as_path)
+    if cursor is None:
+        cursor = CostumeCursor(character, 0, 1)
+    elif cursor.character != character:
+        raise ValueError(f"Cursor belongs to {cursor.character}, not {character}")
+    total = index.costume_count(character)
+    end = total if limit is None else min(total, cursor.position + limit)
+    literals = index.costume_literals(character, cursor.position, end)
+    costumes, no_info_counter = _parse_costume_literals(literals, lazy, cursor.no_info_counter)
+    next_cursor = CostumeCursor(character, end, no_info_counter) if end < total else None
+    print(f"Extracted costumes {cursor.position}-{end} of {total} in {time.time() - start_time:.2f} seconds")
+    return costumes, next_cursor, total
+
+def character_fingerprints(as_path, character, start=0):
+    """Fingerprints of ``character``'s costumes in Misc.as from span ``start`` on.
+
+    Every span is parsed through COSTUME_PARSE_CACHE, so pages that were
+    never loaded into a costume list are covered too.
+    """
+    index = MiscIndex.for_file(as_path)
+    seen = set()
+    for literal in index.costume_literals(character, start):
+        costume_str = "{" + literal[1:-1].strip() + "}"
+        try:
+            seen.add(costume_fingerprint(thaw(COSTUME_PARSE_CACHE.parse(costume_str))))
+        except Exception as e:
+            print(f"Error parsing costume: {e}\nCostume string: {costume_str[:1000]}...")
+    seen.discard(None)
+    return seen
+
+def _parse_costume_literals(literals, lazy=False, no_info_counter=1):
+    costumes = []
+    for literal in literals:
+        costume_str = "{" + literal[1:-1].strip() + "}"
         try:
-            parsed = parse_as3_object(costume_str)
-            costume = as3_to_dict(parsed[0])
-            if "team" in costume:
-                costume["display_name"] = f"Team {costume['team'].capitalize()}"
-            elif "base" in costume and costume["base"]:
-                costume["display_name"] = "Base"
-            elif "info" in costume:
-                costume["display_name"] = costume["info"]
+            if lazy:
+                costume = LazyCostume(scan_costume_metadata(costume_str), costume_str)
             else:
-                costume["display_name"] = f"No Info #{no_info_counter}"
-                no_info_counter += 1
+                costume = thaw(COSTUME_PARSE_CACHE.parse(costume_str))
+            no_info_counter = set_display_name(costume, no_info_counter)
             costumes.append(costume)
         except Exception as e:
             print(f"Error parsing costume: {e}\nCostume string: {costume_str[:1000]}...")  # Truncate for readability
             continue  # Skip malformed costume
-
-    end_time = time.time()
-    print(f"Extracted {len(costumes)} costumes in {end_time - start_time:.2f} seconds")
-    return costumes
+    return costumes, no_info_counter
 
 
 # ... (previous imports and functions remain unchanged)
@@ -321,33 +1300,122 @@ def format_color_for_as3(color):
     raise ValueError(f"Invalid color format: {color}")
 
 
-def update_costumes(original_as_path, new_as_path, character, costumes):
-    print(f"Starting update_costumes for character '{character}' with {len(costumes)} costumes")
-    with open(original_as_path, "r", encoding="utf-8") as f:
-        content = f.read()
-
-    # Find the character's array initialization
-    start_pos = content.find(f'_loc1_["{character}"] = new Array();')
-    if start_pos == -1:
-        end_of_loc1 = content.rfind('};')
-        if end_of_loc1 == -1:
-            raise ValueError("Could not find end of _loc1_ array in Misc.as")
-        new_content = content[:end_of_loc1] + f'\n         _loc1_["{character}"] = new Array();\n'
-        start_pos = end_of_loc1
+def _costume_key(costume, interner):
+    """Content key of a costume dict for matching against Misc.as, or None if it is malformed."""
+    try:
+        return Costume.from_dict(costume, interner).content_key()
+    except ValueError:
+        return None
+
+# Write generated costume literals without the JPEXS-style indentation; False keeps the expanded layout
+MISC_AS_COMPACT = True
+
+class CostumeEmitter:
+    """Writes the costume table statements update_costumes and modify_misc_as generate.
+
+    Compact output puts each statement on one unindented line with no
+    whitespace inside the literal; ``compact=False`` reproduces the layout
+    used before. Palette entries are written as decimals through a shared
+    int -> string table, and the same input always yields the same bytes.
+    """
+    _decimals = {}
+    MAX_CACHED_DECIMALS = 1 << 16
+
+    def __init__(self, compact=None):
+        self.compact = MISC_AS_COMPACT if compact is None else compact
+        self.indent = "" if self.compact else "         "
+
+    def decimal(self, color):
+        """format_color_for_as3_decimal for an int colour, cached."""
+        text = self._decimals.get(color)
+        if text is None:
+            if len(self._decimals) >= self.MAX_CACHED_DECIMALS:
+                self._decimals.clear()
+            text = self._decimals[color] = format_color_for_as3_decimal(color)
+        return text
+
+    def colors(self, values):
+        """Comma-separated palette entries: int colours as cached decimals, strings verbatim."""
+        return ",".join([value if isinstance(value, str) else self.decimal(value) for value in values])
+
+    def value(self, value):
+        """An AS3 literal for a non-palette costume value."""
+        if isinstance(value, bool):
+            return "true" if value else "false"
+        if value is None:
+            return "null"
+        if isinstance(value, str):
+            return f'"{value}"'
+        if isinstance(value, (list, tuple)):
+            return "[" + ",".join(self.value(item) for item in value) + "]"
+        if isinstance(value, dict):
+            return "{" + ",".join(f'"{key}":{self.value(item)}' for key, item in value.items()) + "}"
+        return str(value)
+
+    def array(self, character):
+        return f'{self.indent}_loc1_["{character}"] = new Array();\n'
+
+    def push(self, character, costume, palette_swap, palette_swap_pa):
+        """A ``push({...});`` statement; the palettes are (colors, replacements) lists, see colors()."""
+        fields = [(key, self.value(value)) for key, value in costume.items()
+                  if key not in ("paletteSwap", "paletteSwapPA", "display_name")]
+        swap = (self.colors(palette_swap[0]), self.colors(palette_swap[1]))
+        swap_pa = (self.colors(palette_swap_pa[0]), self.colors(palette_swap_pa[1]))
+        if self.compact:
+            head = "".join(f'"{key}":{value},' for key, value in fields)
+            return (f'_loc1_["{character}"].push({{{head}'
+                    f'"paletteSwap":{{"colors":[{swap[0]}],"replacements":[{swap[1]}]}},'
+                    f'"paletteSwapPA":{{"colors":[{swap_pa[0]}],"replacements":[{swap_pa[1]}]}}}});\n')
+        pieces = [f'         _loc1_["{character}"].push({{\n']
+        pieces += [f'            "{key}":{value},\n' for key, value in fields]
+        pieces.append(f'            "paletteSwap":{{'
+                      f'\n               "colors":[{swap[0]}],'
+                      f'\n               "replacements":[{swap[1]}]'
+                      f'\n            }},\n'
+                      f'            "paletteSwapPA":{{'
+                      f'\n               "colors":[{swap_pa[0]}],'
+                      f'\n               "replacements":[{swap_pa[1]}]'
+                      f'\n            }}\n'
+                      f'         }});\n')
+        return "".join(pieces)
+
+def _palette_text(costume):
+    """Palettes of a costume with every entry written as given, for modify_misc_as."""
+    return tuple(([str(c) for c in costume[key]["colors"]], [str(c) for c in costume[key]["replacements"]])
+                 for key in ("paletteSwap", "paletteSwapPA"))
+
+def _costume_region(index, character, costumes, emitter):
+    """``(start, end, pieces)`` replacing the costume block of ``character`` in the indexed Misc.as."""
+    content = index.content
+
+    # Find the character's region: its array initialization through its last push
+    array_span = index.arrays.get(character)
+    character_entries = index.pushes.get(character, [])
+    if array_span is None:
+        start_pos = end_pos = index.insertion_point()
+        pieces = ["\n", emitter.array(character)]
     else:
-        new_content = content[:start_pos] + f'_loc1_["{character}"] = new Array();\n'
-
-    # Parse existing costumes to preserve their format
-    pattern = f'_loc1_\\["{re.escape(character)}"\\]\\.push\\({{(.*?)}}\\);'
-    character_entries = list(re.finditer(pattern, content, re.DOTALL))
-    existing_costume_strings = [match.group(0) for match in character_entries]
-
-    # Compare costumes to identify new or edited ones
-    existing_costumes = extract_costumes(original_as_path, character)
-    new_costume_entries = []
-    edited_indices = []
+        start_pos = array_span[0]
+        end_pos = character_entries[-1][1] if character_entries else array_span[1]
+        # The array statement keeps its original indentation, which comes before start_pos
+        pieces = [emitter.array(character)[len(emitter.indent):]]
+
+    # Unchanged costumes are matched by content wherever they moved to, so their source text is reused
+    interner = PaletteInterner()
+    unchanged = collections.defaultdict(collections.deque)
+    for j, literal in enumerate(index.costume_literals(character)):
+        try:
+            key = _costume_key(thaw(COSTUME_PARSE_CACHE.parse("{" + literal[1:-1].strip() + "}")), interner)
+        except Exception as e:
+            print(f"Error parsing costume: {e}\nCostume string: {literal[:1000]}...")
+            continue
+        if key is not None:
+            unchanged[key].append(character_entries[j])
+    reused = 0
 
     for i, costume in enumerate(costumes):
+        if isinstance(costume, Costume):
+            costume = costume.to_dict()
         print(f"Processing costume {i} ({costume.get('display_name', f'Costume #{i}')})")
         try:
             if not all(key in costume for key in ["paletteSwap", "paletteSwapPA"]):
@@ -360,94 +1428,92 @@ def update_costumes(original_as_path, new_as_path, character, costumes):
                 if not (isinstance(costume[key]["colors"], list) and isinstance(costume[key]["replacements"], list)):
                     raise ValueError(f"Costume {i} {key} has non-list subkeys: colors={type(costume[key]['colors'])}, replacements={type(costume[key]['replacements'])}")
 
-            # Adjust paletteSwapPA.replacements to preserve transparency from paletteSwap
-            palette_swap_colors = [color_to_int(c) for c in costume["paletteSwap"]["colors"]]
-            palette_swap_replacements = [color_to_int(c) for c in costume["paletteSwap"]["replacements"]]
-            palette_swap_pa_colors = [color_to_int(c) for c in costume["paletteSwapPA"]["colors"]]
-            palette_swap_pa_replacements = [color_to_int(c) for c in costume["paletteSwapPA"]["replacements"]]
-
-            # Map original colors to their replacements in paletteSwap
-            color_map_swap = dict(zip(palette_swap_colors, palette_swap_replacements))
-            # Ensure paletteSwapPA preserves transparency
-            for j, (orig, repl) in enumerate(zip(palette_swap_pa_colors, palette_swap_pa_replacements)):
-                if orig in color_map_swap and color_map_swap[orig] == 0:
-                    if repl != 0:
-                        print(f"Preserving transparency for color {orig} in paletteSwapPA at index {j}")
-                        palette_swap_pa_replacements[j] = 0
-
-            # Convert to decimal strings for ActionScript
-            palette_swap_colors_str = ",".join(format_color_for_as3_decimal(color) for color in palette_swap_colors)
-            palette_swap_replacements_str = ",".join(format_color_for_as3_decimal(color) for color in palette_swap_replacements)
-            palette_swap_pa_colors_str = ",".join(format_color_for_as3_decimal(color) for color in palette_swap_pa_colors)
-            palette_swap_pa_replacements_str = ",".join(format_color_for_as3_decimal(color) for color in palette_swap_pa_replacements)
-
-            # Check if costume is new or edited
-            if i < len(existing_costumes):
-                import json
-                current_json = json.dumps(costume, sort_keys=True)
-                original_json = json.dumps(existing_costumes[i], sort_keys=True)
-                if current_json != original_json:
-                    edited_indices.append(i)
-                    entry = f'         _loc1_["{character}"].push({{\n'
-                    for key, value in costume.items():
-                        if key not in ["paletteSwap", "paletteSwapPA", "display_name"]:
-                            if key == "base":
-                                entry += f'            "{key}":{str(value).lower()},\n'
-                            elif isinstance(value, str):
-                                entry += f'            "{key}":"{value}",\n'
-                            else:
-                                entry += f'            "{key}":{value},\n'
-                    entry += f'            "paletteSwap":{{' \
-                             f'\n               "colors":[{palette_swap_colors_str}],' \
-                             f'\n               "replacements":[{palette_swap_replacements_str}]' \
-                             f'\n            }},\n' \
-                             f'            "paletteSwapPA":{{' \
-                             f'\n               "colors":[{palette_swap_pa_colors_str}],' \
-                             f'\n               "replacements":[{palette_swap_pa_replacements_str}]' \
-                             f'\n            }}\n' \
-                             f'         }});\n'
-                    new_costume_entries.append(entry)
-                else:
-                    if i < len(existing_costume_strings):
-                        new_costume_entries.append(existing_costume_strings[i])
+            # Transparent colours become 0, and paletteSwapPA keeps the transparency paletteSwap gives
+            swap, swap_pa, preserved = written_palettes(costume["paletteSwap"], costume["paletteSwapPA"])
+            for j in preserved:
+                print(f"Preserving transparency for color {swap_pa[0][j]} in paletteSwapPA at index {j}")
+
+            key = _costume_key(costume, interner)
+            if unchanged.get(key):
+                # Unchanged, possibly moved: reuse the original statement text
+                start, end = unchanged[key].popleft()
+                pieces.append(content[start:end])
+                reused += 1
             else:
-                entry = f'         _loc1_["{character}"].push({{\n'
-                for key, value in costume.items():
-                    if key not in ["paletteSwap", "paletteSwapPA", "display_name"]:
-                        if key == "base":
-                            entry += f'            "{key}":{str(value).lower()},\n'
-                        elif isinstance(value, str):
-                            entry += f'            "{key}":"{value}",\n'
-                        else:
-                            entry += f'            "{key}":{value},\n'
-                entry += f'            "paletteSwap":{{' \
-                         f'\n               "colors":[{palette_swap_colors_str}],' \
-                         f'\n               "replacements":[{palette_swap_replacements_str}]' \
-                         f'\n            }},\n' \
-                         f'            "paletteSwapPA":{{' \
-                         f'\n               "colors":[{palette_swap_pa_colors_str}],' \
-                         f'\n               "replacements":[{palette_swap_pa_replacements_str}]' \
-                         f'\n            }}\n' \
-                         f'         }});\n'
-                new_costume_entries.append(entry)
+                pieces.append(emitter.push(character, costume, swap, swap_pa))
             print(f"Successfully processed costume {i}")
         except Exception as e:
             print(f"Error processing costume {i} ({costume.get('display_name', f'Costume #{i}')}): {str(e)}")
             raise
 
-    # Combine preserved and new/edited entries
-    new_content += "".join(new_costume_entries)
+    print(f"Reused the source text of {reused} of {len(costumes)} costumes for {character}")
+    return start_pos, end_pos, pieces
 
-    # Append the rest of the original content
-    if start_pos != -1 and character_entries:
-        end_pos = character_entries[-1].end()
-        new_content += content[end_pos:]
-    else:
-        new_content += content[start_pos:]
+def update_costumes(original_as_path, new_as_path, character, costumes):
+    """Replace the costume block of ``character`` in Misc.as with ``costumes``.
 
-    with open(new_as_path, "w", encoding="utf-8") as f:
-        f.write(new_content)
-    print(f"Updated costumes for {character} at {new_as_path}")
+    Only the character's region (its ``new Array()`` statement through its
+    last push) is regenerated: unchanged costumes reuse their original
+    statement text and the new file and its MiscIndex are spliced together
+    from the untouched text around the region, then written atomically.
+    """
+    print(f"Starting update_costumes for character '{character}' with {len(costumes)} costumes")
+    index = MiscIndex.for_file(original_as_path)
+    new_content, new_index = index.splice(*_costume_region(index, character, costumes, CostumeEmitter()))
+    MiscIndex.write(new_as_path, new_content, new_index)
+    print(f"Updated costumes for {character} at {new_as_path} (Misc.as {len(index.content)} -> {len(new_content)} characters)")
+
+def merge_new_costumes(existing_costumes, new_costumes):
+    """``(combined, added)``: the existing costumes followed by the new ones not already among them.
+
+    Both lists come back as compact Costume objects sharing one
+    PaletteInterner, since Download All holds them for every character
+    until the injection. Duplicates are found by Costume.fingerprint().
+    """
+    interner = PaletteInterner()
+    existing_costumes = [Costume.from_dict(costume, interner) for costume in existing_costumes]
+    seen = {costume.fingerprint() for costume in existing_costumes}
+    added = unique_costumes((Costume.from_dict(costume, interner) for costume in new_costumes), seen)
+    return existing_costumes + added, added
+
+def check_sync_idempotent(catalog_path, character):
+    """Sync a catalog into a scratch Misc.as twice, as Download All does.
+
+    Returns how many costumes the second sync added, which must be 0.
+    """
+    catalog = load_costumes_from_file(catalog_path)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        as_path = os.path.join(temp_dir, "Misc.as")
+        with open(as_path, "w", encoding="utf-8") as f:
+            f.write(render_misc_as({character: []}))
+        added = 0
+        for _ in range(2):
+            combined, added = merge_new_costumes(extract_costumes(as_path, character), catalog)
+            if added:
+                update_costumes(as_path, as_path, character, combined)
+        return len(added)
+
+def update_costumes_batch(original_as_path, new_as_path, updates):
+    """update_costumes for several characters, writing Misc.as once.
+
+    ``updates`` maps characters to costume lists (or is a list of pairs).
+    Every region is computed against the original index and the new
+    script is assembled in a single pass; new characters are appended in
+    the given order.
+    """
+    updates = list(updates.items()) if isinstance(updates, dict) else list(updates)
+    print(f"Starting batch costume update for {len(updates)} characters")
+    start_time = time.time()
+    index = MiscIndex.for_file(original_as_path)
+    emitter = CostumeEmitter()
+    regions = {}
+    for character, costumes in updates:
+        # A character listed twice keeps its last costume list, as sequential updates would
+        regions[character] = _costume_region(index, character, costumes, emitter)
+    new_content, new_index = index.splice_regions(regions.values())
+    MiscIndex.write(new_as_path, new_content, new_index)
+    print(f"Updated costumes for {', '.join(regions)} at {new_as_path} in {time.time() - start_time:.2f} seconds "
+          f"(Misc.as {len(index.content)} -> {len(new_content)} characters)")
 
 def format_color_for_as3_decimal(color):
     if isinstance(color, str):
@@ -467,86 +1533,136 @@ def format_color_for_as3_decimal(color):
         return "0"
     return str(color_int & 0xFFFFFFFF)
 def color_to_int(color):
-    if isinstance(color, str):
-        color_str = color.replace("#", "").replace("0x", "")
-        if not all(c in "0123456789ABCDEFabcdef" for c in color_str):
-            raise ValueError(f"Invalid hex characters in {color}")
-        if len(color_str) == 8:
-            color_int = int(color_str, 16)
-            # Check if alpha is 0 (transparent)
-            if (color_int & 0xFF000000) == 0:
-                return 0
-            return color_int
-        elif len(color_str) == 6:
-            print(f"Warning: 6-digit hex {color} assumed opaque (alpha=FF)")
-            return int(color_str + "FF", 16)
-        raise ValueError(f"Invalid hex length: {color}")
-    elif isinstance(color, int):
-        # If color is 0 or has alpha 0, treat as transparent
-        if color == 0 or (color & 0xFF000000) == 0:
-            return 0
-        return color & 0xFFFFFFFF
-    raise ValueError(f"Invalid color type: {type(color)}")
+    """A palette entry as a 32-bit ARGB int; any colour with alpha 0 is transparent (0)."""
+    if isinstance(color, str) and len(color.strip().replace("#", "").replace("0x", "")) == 6:
+        print(f"Warning: 6-digit hex {color} assumed opaque (alpha=FF)")
+    return written_color(color)
 def int_to_color_str(color_int):
     if color_int == 0:
         return "0x00000000"
     color_int = color_int & 0xFFFFFFFF
     return f"0x{color_int:08X}"
-def load_costumes_from_file(file_path):
-    """Load costumes from a .as or .txt file."""
-    with open(file_path, "r", encoding="utf-8") as f:
-        content = f.read()
-
-    content = content.strip()
-    if content.startswith("[") and content.endswith("]"):
-        content = content[1:-1]
 
-    costumes = []
-    brace_count = 0
-    current_costume = ""
+CATALOG_CHUNK_SIZE = 64 * 1024
+_CATALOG_SEPARATORS = re.compile(r"[\s,\[\]]*")
+
+def _label_catalog_costume(costume, no_info_counter, source):
+    """Check a costume read from a catalog and give it a display name.
+
+    Returns the updated "No Info" counter, or None if the costume is skipped.
+    """
+    if not isinstance(costume, dict) or not all(key in costume for key in ["paletteSwap", "paletteSwapPA"]):
+        print(f"Skipping costume from {source}: Missing 'paletteSwap' or 'paletteSwapPA' keys.")
+        return None
+    for key in ["paletteSwap", "paletteSwapPA"]:
+        if not isinstance(costume[key], dict):
+            print(f"Skipping costume from {source}: {key} is not a dictionary.")
+            return None
+        if not all(subkey in costume[key] for subkey in ["colors", "replacements"]):
+            print(f"Skipping costume from {source}: {key} missing 'colors' or 'replacements'.")
+            return None
+        if not (isinstance(costume[key]["colors"], list) and isinstance(costume[key]["replacements"], list)):
+            print(f"Skipping costume from {source}: {key} 'colors' or 'replacements' are not lists.")
+            return None
+    if "team" in costume:
+        costume["display_name"] = f"Team {costume['team'].capitalize()}"
+    elif "base" in costume and costume["base"] is True:
+        costume["display_name"] = "Base"
+    elif "info" in costume:
+        costume["display_name"] = costume["info"]
+    else:
+        costume["display_name"] = f"No Info #{no_info_counter}"
+        no_info_counter += 1
+    return no_info_counter
+
+def iter_catalog_costumes(chunks, source="file"):
+    """Yield validated costumes from a costume catalog as its text arrives.
+
+    ``chunks`` is an iterable of text pieces (file reads, HTTP body chunks).
+    The catalog is a JSON array, or a comma-separated run of objects; each
+    object is decoded with JSONDecoder.raw_decode straight from a buffer
+    that only holds text not yet consumed. Malformed objects are reported
+    and skipped.
+    """
+    decoder = json.JSONDecoder()
+    chunks = iter(chunks)
+    buffer = ""
+    pos = 0
+    eof = False
     no_info_counter = 1
 
-    for char in content:
-        if char == '{':
-            brace_count += 1
-        elif char == '}':
-            brace_count -= 1
-        current_costume += char
-        if brace_count == 0 and current_costume.strip():
+    def fill():
+        nonlocal buffer, pos, eof
+        chunk = next(chunks, None)
+        if chunk is None:
+            eof = True
+            return False
+        buffer = buffer[pos:] + chunk
+        pos = 0
+        return True
+
+    while True:
+        pos = _CATALOG_SEPARATORS.match(buffer, pos).end()
+        if pos == len(buffer):
+            if eof or not fill():
+                return
+            continue
+        if buffer[pos] != "{":
+            next_object = buffer.find("{", pos)
+            print(f"Skipping unexpected text in costumes from {source}: {buffer[pos:pos + 40]!r}")
+            if next_object == -1:
+                pos = len(buffer)
+            else:
+                pos = next_object
+            continue
+        try:
+            costume, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError as e:
+            # Balanced braces mean the object is malformed; otherwise it is cut off, so read on.
             try:
-                costume = json.loads(current_costume.strip().rstrip(","))
-                if not all(key in costume for key in ["paletteSwap", "paletteSwapPA"]):
-                    print(f"Skipping costume: Missing 'paletteSwap' or 'paletteSwapPA' keys.")
-                    continue
-                for key in ["paletteSwap", "paletteSwapPA"]:
-                    if not isinstance(costume[key], dict):
-                        print(f"Skipping costume: {key} is not a dictionary.")
-                        continue
-                    if not all(subkey in costume[key] for subkey in ["colors", "replacements"]):
-                        print(f"Skipping costume: {key} missing 'colors' or 'replacements'.")
-                        continue
-                    if not (isinstance(costume[key]["colors"], list) and isinstance(costume[key]["replacements"], list)):
-                        print(f"Skipping costume: {key} 'colors' or 'replacements' are not lists.")
-                        continue
-                if "team" in costume:
-                    team_color = costume["team"].capitalize()
-                    costume["display_name"] = f"Team {team_color}"
-                    print(f"File load - Found team costume: Team {team_color}")
-                elif "base" in costume and costume["base"] is True:
-                    costume["display_name"] = "Base"
-                    print(f"File load - Found base costume: Base")
-                elif "info" in costume:
-                    costume["display_name"] = costume["info"]
-                    print(f"File load - Using info as display name: {costume['display_name']}")
-                else:
-                    costume["display_name"] = f"No Info #{no_info_counter}"
-                    no_info_counter += 1
-                    print(f"File load - Assigned No Info: {costume['display_name']}")
-                costumes.append(costume)
-            except json.JSONDecodeError as e:
-                print(f"Error parsing costume: {e}")
-            current_costume = ""
+                end = _skip_as3_value(buffer, pos)
+            except ValueError:
+                end = None
+            if end is None and not eof and fill():
+                continue
+            print(f"Error parsing costume from {source}: {e}")
+            if end is None:
+                # Unbalanced to the end of the catalog: resync on the next object.
+                end = buffer.find("{", pos + 1)
+                if end == -1:
+                    return
+            pos = end
+            continue
+        pos = end
+        counter = _label_catalog_costume(costume, no_info_counter, source)
+        if counter is not None:
+            no_info_counter = counter
+            yield costume
+
+def iter_costumes_from_catalog(catalog, source="file"):
+    """Yield validated costumes of every character in a binary CostumeCatalog."""
+    no_info_counter = 1
+    for character in catalog.characters():
+        for position in range(catalog.count(character)):
+            costume = catalog.costume(character, position)
+            counter = _label_catalog_costume(costume, no_info_counter, source)
+            if counter is not None:
+                no_info_counter = counter
+                yield costume
+
+def iter_costumes_from_file(file_path):
+    """Yield costumes from a .as or .txt catalog file while it is read, or from a binary .ssfc catalog."""
+    if file_path.endswith(CATALOG_EXTENSION):
+        with CostumeCatalog.open(file_path) as catalog:
+            yield from iter_costumes_from_catalog(catalog, source="file")
+        return
+    with open(file_path, "r", encoding="utf-8") as f:
+        yield from iter_catalog_costumes(iter(lambda: f.read(CATALOG_CHUNK_SIZE), ""), source="file")
 
+def load_costumes_from_file(file_path):
+    """Load costumes from a .as or .txt file."""
+    costumes = list(iter_costumes_from_file(file_path))
+    print(f"Loaded {len(costumes)} costumes from {file_path}")
     return costumes
 
 def check_url_exists(url):
@@ -561,74 +1677,98 @@ def check_url_exists(url):
         print(f"Error checking URL: {str(e)}")
         return False
 
-def load_costumes_from_url(url):
-    """Load costumes from a URL."""
+def iter_costumes_from_url(url):
+    """Yield costumes from a catalog URL while the response body streams in."""
     print(f"Fetching costumes from URL: {url}")
     try:
-        response = requests.get(url, timeout=5)
-        response.raise_for_status()
-        content = response.text.strip()
-        print(f"Successfully fetched content from URL (length: {len(content)} characters)")
-
-        if content.startswith("[") and content.endswith("]"):
-            content = content[1:-1]
-
-        content = content.strip().rstrip(",")
-
-        costumes = []
-        brace_count = 0
-        current_costume = ""
-        no_info_counter = 1
-
-        for char in content:
-            if char == '{':
-                brace_count += 1
-            elif char == '}':
-                brace_count -= 1
-            current_costume += char
-            if brace_count == 0 and current_costume.strip():
-                cleaned_costume = current_costume.strip()
-                if cleaned_costume.startswith("{") and cleaned_costume.endswith("}"):
-                    try:
-                        costume = json.loads(cleaned_costume.rstrip(","))
-                        if not all(key in costume for key in ["paletteSwap", "paletteSwapPA"]):
-                            print(f"Skipping costume from URL: Missing 'paletteSwap' or 'paletteSwapPA' keys.")
-                            continue
-                        for key in ["paletteSwap", "paletteSwapPA"]:
-                            if not isinstance(costume[key], dict):
-                                print(f"Skipping costume from URL: {key} is not a dictionary.")
-                                continue
-                            if not all(subkey in costume[key] for subkey in ["colors", "replacements"]):
-                                print(f"Skipping costume from URL: {key} missing 'colors' or 'replacements'.")
-                                continue
-                            if not (isinstance(costume[key]["colors"], list) and isinstance(costume[key]["replacements"], list)):
-                                print(f"Skipping costume from URL: {key} 'colors' or 'replacements' are not lists.")
-                                continue
-                        if "team" in costume:
-                            team_color = costume["team"].capitalize()
-                            costume["display_name"] = f"Team {team_color}"
-                            print(f"URL load - Found team costume: Team {team_color}")
-                        elif "base" in costume and costume["base"] is True:
-                            costume["display_name"] = "Base"
-                            print(f"URL load - Found base costume: Base")
-                        elif "info" in costume:
-                            costume["display_name"] = costume["info"]
-                            print(f"URL load - Using info as display name: {costume['display_name']}")
-                        else:
-                            costume["display_name"] = f"No Info #{no_info_counter}"
-                            no_info_counter += 1
-                            print(f"URL load - Assigned No Info: {costume['display_name']}")
-                        costumes.append(costume)
-                    except json.JSONDecodeError as e:
-                        print(f"Error parsing costume from URL: {e}")
-                current_costume = ""
-
-        print(f"Loaded {len(costumes)} costumes from URL")
-        return costumes
+        with requests.get(url, timeout=5, stream=True) as response:
+            response.raise_for_status()
+            if url.endswith(CATALOG_EXTENSION):
+                # Spool the compiled catalog to disk in chunks and map it instead of buffering the body
+                fd, temp_path = tempfile.mkstemp(suffix=CATALOG_EXTENSION)
+                try:
+                    with os.fdopen(fd, "wb") as f:
+                        for chunk in response.iter_content(CATALOG_CHUNK_SIZE):
+                            f.write(chunk)
+                    with CostumeCatalog.open(temp_path) as catalog:
+                        yield from iter_costumes_from_catalog(catalog, source="URL")
+                finally:
+                    os.remove(temp_path)
+                return
+            response.encoding = response.encoding or "utf-8"
+            yield from iter_catalog_costumes(response.iter_content(CATALOG_CHUNK_SIZE, decode_unicode=True), source="URL")
     except requests.RequestException as e:
         print(f"Failed to fetch costumes from URL: {str(e)}")
         raise
 
+def load_costumes_from_url(url):
+    """Load costumes from a URL."""
+    costumes = list(iter_costumes_from_url(url))
+    print(f"Loaded {len(costumes)} costumes from URL")
+    return costumes
+
+CATALOG_BASE_URL = "https://raw.githubusercontent.com/masterwebx/Color-Vault/refs/heads/master"
+
+def fetch_catalog_manifest(base_url=CATALOG_BASE_URL):
+    """Download catalog-manifest.json; returns a CatalogManifest, or None if it is unavailable."""
+    url = f"{base_url}/{MANIFEST_NAME}"
+    try:
+        response = requests.get(url, timeout=5)
+        response.raise_for_status()
+        manifest = CatalogManifest(response.json())
+    except (requests.RequestException, ValueError, KeyError) as e:
+        print(f"Catalog manifest unavailable at {url}: {e}")
+        return None
+    print(f"Loaded catalog manifest with {len(manifest.catalogs)} catalogs")
+    return manifest
+
+class CatalogCache:
+    """Local copies of downloaded catalogs, reused while the manifest's SHA-256 still matches."""
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, name):
+        return os.path.join(self.cache_dir, name.replace("/", "__"))
+
+    def get(self, manifest, name):
+        """The cached bytes of catalog ``name``, or None if missing or changed upstream."""
+        try:
+            with open(self._path(name), "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        return data if manifest.is_current(name, data) else None
+
+    def put(self, name, data):
+        write_file_atomic(self._path(name), data)
+
+def load_catalog_costumes(manifest, character, cache=None, base_url=CATALOG_BASE_URL):
+    """Costumes of a character's online catalog, downloaded only if the cached copy is out of date.
+
+    The compiled .ssfc catalog is used when the manifest lists a current one.
+    """
+    if manifest.catalog_name(character) is None:
+        return []
+    name = manifest.binary_name(character) or manifest.catalog_name(character)
+    data = cache.get(manifest, name) if cache is not None else None
+    if data is None:
+        url = f"{base_url}/{name}"
+        print(f"Fetching costumes from URL: {url}")
+        response = requests.get(url, timeout=5)
+        response.raise_for_status()
+        data = response.content
+        if cache is not None and manifest.is_current(name, data):
+            cache.put(name, data)
+    else:
+        print(f"Catalog {name} unchanged, using the cached copy")
+    if name.endswith(CATALOG_EXTENSION):
+        costumes = list(iter_costumes_from_catalog(CostumeCatalog(data), source="URL"))
+    else:
+        costumes = list(iter_catalog_costumes([data.decode("utf-8-sig")], source="URL"))
+    print(f"Loaded {len(costumes)} costumes from {name}")
+    return costumes
+
 def launch_ssf2(exe_path):
     """Launch SSF2 executable."""
     if not os.path.isfile(exe_path) or not exe_path.endswith("SSF2.exe"):